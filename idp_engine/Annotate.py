@@ -29,7 +29,7 @@ import string  # .digits
 from .Parse import (TemporalDeclaration, IDP, Vocabulary, Import, TypeDeclaration, Declaration,
                     SymbolDeclaration, VarDeclaration, TheoryBlock, Definition,
                     Rule, Structure, SymbolInterpretation, Enumeration, Ranges,
-                    FunctionEnum, TupleIDP, ConstructedFrom, Display)
+                    FunctionEnum, FileEnumeration, TupleIDP, ConstructedFrom, Display)
 from .Expression import (ONE, ASumMinus, ASTNode, CauseFalseAppliedSymbol, CauseTrueAppliedSymbol, Expression, ForNext, NextAppliedSymbol, NowAppliedSymbol, StartAppliedSymbol, SETNAME, SetName,
                          BOOL_SETNAME, INT_SETNAME, REAL_SETNAME, DATE_SETNAME, EMPTY_SETNAME,
                          Constructor, CONSTRUCTOR, AIfExpr, IF,
@@ -37,7 +37,7 @@ from .Expression import (ONE, ASumMinus, ASTNode, CauseFalseAppliedSymbol, Cause
                          AEquivalence, AConjunction, ADisjunction,
                          Operator, AComparison, ASumMinus, AMultDiv, APower, AUnary,
                          AAggregate, AppliedSymbol, UnappliedSymbol, Variable,
-                         VARIABLE, Brackets, SymbolExpr, Number, NOT,
+                         VARIABLE, Brackets, SymbolExpr, Number, NOT, NO_VARIABLES,
                          EQUALS, AND, OR, FALSE, ZERO, IMPLIES, FORALL, EXISTS)
 
 from .utils import (BOOL, INT, REAL, DATE, CONCEPT, RESERVED_SYMBOLS, TIJD,
@@ -219,7 +219,7 @@ def annotate(self: Expression,
                f'Undeclared symbol name: "{self.name}"')
 
     self.decl = voc.symbol_decls[self.name]
-    self.variables = set()
+    self.variables = NO_VARIABLES
     self.type = self.decl.codomain
     self.root_set = root_set(self)
     if self.codomain:  # a concept domain
@@ -239,6 +239,8 @@ def annotate_block(self: ASTNode,
                    ) -> Exceptions:
     out = []
     assert isinstance(self, TheoryBlock), "Internal error"
+    #Used to annotate the initial, bistate and transition theories on first use; Used in the context fo LTC theories
+    self.idp = idp
     if self.inv:
         return out
     #print(idp.vocabularies.keys())
@@ -246,15 +248,6 @@ def annotate_block(self: ASTNode,
                 f"Unknown vocabulary: {self.vocab_name}")
     self.voc = idp.vocabularies[self.vocab_name]
 
-    #Annotating the initial, bistate and transition theories; Used in the context fo LTC theories
-    #Has to be used before interpretation annotate add_voc_to_block
-    annotate_init_theory(self,idp)
-    #print("init theory")
-    annotate_bis_theory(self,idp)
-    #print("bs theory")
-    annotate_trs_theory(self,idp)
-    #print("trs theory")
-
 
     for i in self.interpretations.values():
         if self.ltc:
@@ -305,13 +298,13 @@ def annotate_block(self: ASTNode,
     
 TheoryBlock.annotate_block = annotate_block
 
-#Use this before interpretations have been annotated and add_voc_to_block to avoid duplicate enumerations
+#The interpretations are taken from org_theory, i.e., before they have been annotated and add_voc_to_block to avoid duplicate enumerations
 #Annotation of interpretation applied twice would result in error
 def annotate_init_theory(theory:TheoryBlock,idp):
     if theory.ltc and theory.init_theory:
         voc = idp.now_voc[theory.init_theory.vocab_name]
         theory.init_theory.voc = voc
-        for i in theory.interpretations.values():
+        for i in theory.org_theory.interpretations.values():
             #print("inside init interp")
             r = i.initialize_temporal_interpretation([]) #idp.vocabularies[theory.vocab_name].tempdcl
             theory.init_theory.interpretations[r.name] = r
@@ -329,12 +322,13 @@ def annotate_init_theory(theory:TheoryBlock,idp):
         #print("i0")
         theory.init_theory.constraints = OrderedSet([e.annotate(voc, {},False)
                                     for e in theory.init_theory.constraints])
-        
+TheoryBlock.annotate_init_theory = annotate_init_theory
+
 def annotate_bis_theory(theory:TheoryBlock,idp):
     if theory.ltc and theory.bistate_theory:
         voc = idp.next_voc[theory.bistate_theory.vocab_name]
         theory.bistate_theory.voc = voc
-        for i in theory.interpretations.values():
+        for i in theory.org_theory.interpretations.values():
             #print("inside interp")
             #Given that symbol interpretation of temporal predicates are not allowed in ltc theories we given empty tempdcl
             r = i.initialize_temporal_interpretation([])
@@ -353,6 +347,7 @@ def annotate_bis_theory(theory:TheoryBlock,idp):
         theory.bistate_theory.constraints = OrderedSet([e.annotate(voc, {},False)
                                     for e in theory.bistate_theory.constraints])
         #print("ch2")
+TheoryBlock.annotate_bis_theory = annotate_bis_theory
 
 def annotate_trs_theory(theory:TheoryBlock,idp):
     if theory.ltc and theory.transition_theory:
@@ -374,6 +369,7 @@ def annotate_trs_theory(theory:TheoryBlock,idp):
         theory.transition_theory.constraints = ([e.annotate(voc, {})
                                     for e in theory.transition_theory.constraints])
         #print("ch2")
+TheoryBlock.annotate_trs_theory = annotate_trs_theory
 
 def annotate_exp_theory(theory:TheoryBlock,voc:Vocabulary):
     theory.voc = voc
@@ -720,10 +716,10 @@ def annotate_block(self: ASTNode,
     self.check(self.vocab_name in idp.vocabularies,
                f"Unknown vocabulary: {self.vocab_name}")
     self.voc = idp.vocabularies[self.vocab_name]
-    annotate_init_structure(self,idp)
-    annotate_static_structure(self,idp,"_now")
-    annotate_static_structure(self,idp,"_next")
-    expanded_static_struct(self,idp)
+    #The structures for LTC theories are derived on first use, from a copy of the interpretations:
+    #the interpretations are modified by annotation and by Theory
+    if self.voc.tempdcl or any(t.ltc for t in idp.theories.values()):
+        self.source_interpretations = [i.init_copy() for i in self.interpretations.values()]
     for i in self.interpretations.values():
         #TO DO : IF A STRUCTURE IS NOT USED THEN THERE COULD BE ERROR DUE TO TIJD HAVING NO INTERPRETATION
         if i.name == TIJD:
@@ -748,20 +744,22 @@ def annotate_init_structure(s,idp):
     name = s.name+'now'
     voc = idp.now_voc[s.vocab_name+'_now']
     #print("s1")
-    s.init_struct = Structure(name=name,vocab_name=vocab_name,interpretations={})
-    s.init_struct.voc = voc
+    init_struct = Structure(name=name,vocab_name=vocab_name,interpretations={})
+    init_struct.voc = voc
     #print("s2")
-    for i in s.interpretations.values():
+    for i in s.source_interpretations:
         if i.name != TIJD:
             r = i.initialize_temporal_interpretation(idp.vocabularies[s.vocab_name].tempdcl)
             #print("s3")
             #print(i)
-            s.init_struct.interpretations[r.name] = r
-            r.block = s.init_struct
+            init_struct.interpretations[r.name] = r
+            r.block = init_struct
             r.annotate(voc,{})
         #print("s4")
     #print("s5")
-    voc.add_voc_to_block(s.init_struct)
+    voc.add_voc_to_block(init_struct)
+    s._init_struct = init_struct
+Structure.annotate_init_structure = annotate_init_structure
 
 def annotate_static_structure(s,idp,suffix:str):
     now = False
@@ -773,18 +771,16 @@ def annotate_static_structure(s,idp,suffix:str):
     if suffix == "_now":
         now = True
         voc = idp.now_voc[s.vocab_name+suffix]
-        s.static_now = Structure(name=name,vocab_name=vocab_name,interpretations={})
-        s.static_now.voc = voc
     elif suffix == "_next":
         next = True
         voc = idp.next_voc[s.vocab_name+suffix]
-        s.static_next = Structure(name=name,vocab_name=vocab_name,interpretations={})
-        s.static_next.voc = voc
     else:
         return
+    static = Structure(name=name,vocab_name=vocab_name,interpretations={})
+    static.voc = voc
     tempdc = idp.vocabularies[s.vocab_name].tempdcl 
     #print("s2")
-    for i in s.interpretations.values():
+    for i in s.source_interpretations:
         if i.name != TIJD:
             add = True
             for t in tempdc:
@@ -800,26 +796,24 @@ def annotate_static_structure(s,idp,suffix:str):
                     default = i.default.init_copy()
                 r = SymbolInterpretation(parent=None,name= UnappliedSymbol(None,(i.name)),sign = i.sign,
                                     enumeration=enum, default=default)
-                if now:
-                    s.static_now.interpretations[r.name] = r
-                    r.block = s.static_now
-                elif next:
-                    s.static_next.interpretations[r.name] = r
-                    r.block = s.static_next
+                static.interpretations[r.name] = r
+                r.block = static
                 r.annotate(voc,{})
 
+    voc.add_voc_to_block(static)
     if now:
-        voc.add_voc_to_block(s.static_now)
+        s._static_now = static
     elif next:
-        voc.add_voc_to_block(s.static_next)
+        s._static_next = static
+Structure.annotate_static_structure = annotate_static_structure
 
 def expanded_static_struct(s:Structure,idp):
     suffix = "_expanded"
     vocab_name = s.vocab_name+suffix
     name = s.name+'static' + suffix
-    s.static_expanded = Structure(name=name,vocab_name=vocab_name,interpretations={})
+    static_expanded = Structure(name=name,vocab_name=vocab_name,interpretations={})
     tempdc = idp.vocabularies[s.vocab_name].tempdcl 
-    for i in s.interpretations.values():
+    for i in s.source_interpretations:
         if i.name != TIJD:
             add = True
             for t in tempdc:
@@ -836,8 +830,10 @@ def expanded_static_struct(s:Structure,idp):
                 r = SymbolInterpretation(parent=None,name= UnappliedSymbol(None,(i.name)),sign = i.sign,
                                     enumeration=enum, default=default)
                 
-                s.static_expanded.interpretations[r.name] = r
-                r.block = s.static_expanded
+                static_expanded.interpretations[r.name] = r
+                r.block = static_expanded
+    s._static_expanded = static_expanded
+Structure.expanded_static_struct = expanded_static_struct
 
 # Class SymbolInterpretation  #######################################################
 
@@ -907,6 +903,29 @@ def annotate(self: Expression,
 Enumeration.annotate = annotate
 
 
+# Class FileEnumeration  #######################################################
+
+def annotate(self: Expression,
+             voc: Vocabulary,
+             q_vars: dict[str, Variable],
+             ltc=False,temporal_head=-1
+             ) -> Annotated:
+    assert isinstance(self, FileEnumeration), "Internal error"
+    # the tuples share their values: annotate each value once
+    values: dict[int, Expression] = {}
+    for t in self.tuples:
+        for a in t.args:
+            if id(a) not in values:
+                value = a.annotate(voc, q_vars)
+                self.check(value.is_value(),
+                           f"{self.path} may only contain numerals,"
+                           f" identifiers or constructors: '{a}'")
+                values[id(a)] = value
+        t.args = [values[id(a)] for a in t.args]
+    return self
+FileEnumeration.annotate = annotate
+
+
 # Class TupleIDP  #######################################################
 
 def annotate(self: Expression,
@@ -1061,9 +1080,8 @@ Expression.annotate = annotate
 
 def fill_attributes_and_check(self: Expression) -> Expression:
     " annotations that are common to __init__ and make() "
-    self.variables = set()
-    for e in self.sub_exprs:
-        self.variables.update(e.variables)
+    variables = [e.variables for e in self.sub_exprs if e.variables]
+    self.variables = set().union(*variables) if variables else NO_VARIABLES
     return self
 Expression.fill_attributes_and_check = fill_attributes_and_check
 
@@ -1157,6 +1175,7 @@ AQuantification.annotate = annotate
 
 def fill_attributes_and_check(self: AQuantification) -> Expression:
     Expression.fill_attributes_and_check(self)
+    self.variables = set(self.variables)
     for q in self.quantees:  # remove declared variables
         for vs in q.vars:
             for v in vs:
@@ -1447,7 +1466,8 @@ def fill_attributes_and_check(self: AppliedSymbol, type_check=True) -> Expressio
     out = Expression.fill_attributes_and_check(self)
     assert type(out) == AppliedSymbol, "Internal error"
     out.symbol = out.symbol.fill_attributes_and_check()
-    out.variables.update(out.symbol.variables)
+    if out.symbol.variables:
+        out.variables = out.variables | out.symbol.variables
     if not out.decl and out.symbol.name:
         out.decl = out.symbol.decl
 
@@ -1661,7 +1681,7 @@ def annotate(self: UnappliedSymbol,
     if self.name in voc.symbol_decls:
         self.decl = voc.symbol_decls[self.name]
         self.type = self.decl.codomain
-        self.variables = set()
+        self.variables = NO_VARIABLES
         self.check(type(self.decl) == Constructor,
                    f"{self} should be applied to arguments (or prefixed with a back-tick)")
         return self
@@ -157,6 +157,9 @@ class Assignment(object):
 
         is_certainly_undefined (bool): True for functions applied to arguments certainly outside of its domain
 
+        is_derived (bool): True if the value was computed from a definition,
+            even though its status is STRUCTURE (see `Definition.materialize`)
+
         relevant (bool, optional): states whether the sentence is relevant
 
         symbol_decl (SymbolDeclaration): declaration of the symbol under which
@@ -171,6 +174,7 @@ class Assignment(object):
         self.value: Optional[Expression] = value
         self.status: Optional[Status] = status
         self.is_certainly_undefined = False
+        self.is_derived = False
         self.relevant: Optional[bool] = relevant
 
         # First symbol in the sentence, preferably not starting with '_':
@@ -178,8 +182,8 @@ class Assignment(object):
         # private one is used.
         self.symbol_decl: Optional[SymbolDeclaration] = None
         default = None
-        self.symbols: dict[str, SymbolDeclaration] = \
-            sentence.collect_symbols(co_constraints=False).values()
+        self.symbols: List[SymbolDeclaration] = \
+            list(sentence.collect_symbols(co_constraints=False).values())
         for d in self.symbols:
             if not d.name.startswith('_'):
                 if not d.by_z3:  # ignore accessors and testers
@@ -333,7 +337,8 @@ class Assignments(dict):
         nullary = set()
         for a in self.values():
             if type(a.sentence) == AppliedSymbol:
-                if a.status not in [Status.DEFAULT, Status.STRUCTURE]:
+                if (a.status not in [Status.DEFAULT, Status.STRUCTURE]
+                    or a.is_derived):
                     enumerated[a.symbol_decl] = False
                 args = ", ".join(str(e) for e in a.sentence.sub_exprs)
                 args = f"({args})" if 1 < len(a.sentence.sub_exprs) else args
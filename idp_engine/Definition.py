@@ -24,14 +24,17 @@ This module contains methods and functions for the handling of definitions
 from __future__ import annotations
 
 from copy import deepcopy
-from typing import (Set, Tuple, List, Optional)
+from typing import (Any, Set, Tuple, List, Optional)
 
-from .utils import (RESERVED_SYMBOLS, Semantics, CO_CONSTR_RECURSION_DEPTH, REAL)
+from .utils import (RESERVED_SYMBOLS, Semantics, CO_CONSTR_RECURSION_DEPTH, REAL,
+                    DEFAULT)
 from .Expression import (Expression, ZERO, TRUE, FALSE, RecDef,
                          Constructor, SETNAME, SetName, AppliedSymbol, Operator, AImplication,
                          ARImplication, AAggregate, AUnary, AIfExpr, AComparison,
+                         AConjunction, ADisjunction, AQuantification, Brackets, UnappliedSymbol,
                          IF, IMPLIES, EQUALS, EQUIV, FORALL, OR, AND, BOOL_SETNAME, INT_SETNAME, REAL_SETNAME)
-from .Parse import Definition, Rule, SymbolDeclaration
+from .Parse import (Definition, Rule, SymbolDeclaration, SymbolInterpretation,
+                    Enumeration, TupleIDP)
 from .Theory import Theory
 
 
@@ -147,7 +150,8 @@ def instantiate_definition(self: Definition, decl, new_args, theory) -> Optional
     # exclude inductive and recursive definitions
     if rule and self.mode != Semantics.RECDATA and decl not in self.inductive:
         instantiable = all(  # finite domain or not a variable
-            s.extension(theory.extensions)[0] is not None
+            (s.extension(theory.extensions)[0] is not None
+             and theory.grounding != "lifted")  # the variable is not expanded
             or not v.has_variables()
             for s, v in zip(rule.definiendum.decl.domains, new_args))
 
@@ -172,6 +176,145 @@ def instantiate_definition(self: Definition, decl, new_args, theory) -> Optional
 Definition.instantiate_definition = instantiate_definition
 
 
+def materialize(self: Definition, problem: Theory) -> bool:
+    """Computes the predicates defined by `self` bottom-up, in `problem`,
+    when their rules only depend on symbols with a known interpretation.
+
+    The rules are instantiated once for each tuple of the defined predicates,
+    then evaluated semi-naively: a rule is re-evaluated only when
+    an atom in its body has just been derived.
+    The defined predicates are then interpreted in `problem`,
+    as if they were enumerated in a structure,
+    instead of being translated to Z3 with their completion and level mapping.
+
+    Args:
+        problem (Theory): the context for the evaluation; its interpretations are updated
+
+    Returns:
+        bool: False if the definition could not be evaluated,
+        and must be translated to Z3 instead
+    """
+    if (problem.extended  # the rules are needed for explanations
+        or not self.rules or self.rules[0].block is None
+        or self.mode == Semantics.RECDATA
+        or (self.inductive and self.mode not in [Semantics.WELLFOUNDED,
+                                                  Semantics.STABLE])):
+        return False
+    names = set(decl.name for decl in self.clarks)
+    for decl, rule in self.clarks.items():
+        if (decl.codomain != BOOL_SETNAME or not decl.instances
+            or decl.name in problem.interpretations
+            or any(s.extension(problem.extensions)[1] is not None
+                   for s in decl.domains)):
+            return False
+        for name in rule.body.collect_symbols(co_constraints=False):
+            interpretation = problem.interpretations.get(name, None)
+            if name not in names and (interpretation is None
+                                      or interpretation.sign != '≜'
+                                      or interpretation.block.name == DEFAULT):
+                return False
+
+    # instantiate the rules
+    bodies: dict[str, Any] = {}  # head code -> ground body
+    watches: dict[str, List[str]] = {}  # atom code -> heads with the atom in their body
+    for decl, rule in self.clarks.items():
+        variables = [v.name for v in rule.definiendum.sub_exprs]
+        for code, instance in decl.instances.items():
+            subs = dict(zip(variables, instance.sub_exprs))
+            body = rule.body if subs else deepcopy(rule.body)
+            ground = _positive(body.interpret(problem, subs), names)
+            if ground is None:  # e.g., negation of a defined atom
+                problem.ground_terms = {}
+                self.cache = {}
+                return False
+            bodies[code] = ground
+            for atom in _atoms(ground):
+                watches.setdefault(atom, []).append(code)
+    problem.ground_terms = {}  # do not re-use the atoms of the evaluation
+    self.cache = {}
+
+    # semi-naive evaluation
+    true: set[str] = set()
+    todo = [head for head, body in bodies.items() if _holds(body, true)]
+    true.update(todo)
+    while todo:
+        for head in watches.get(todo.pop(), []):
+            if head not in true and _holds(bodies[head], true):
+                true.add(head)
+                todo.append(head)
+
+    # interpret the defined predicates
+    for decl in self.clarks:
+        if decl.arity == 0:
+            enumeration, default = None, (TRUE if decl.instances and
+                                          next(iter(decl.instances)) in true
+                                          else FALSE)
+        else:
+            enumeration = Enumeration(parent=None, tuples=[
+                TupleIDP(args=list(instance.sub_exprs))
+                for code, instance in decl.instances.items() if code in true])
+            default = FALSE
+        interpretation = SymbolInterpretation(
+            parent=None, name=UnappliedSymbol(None, decl.name), sign=':=',
+            enumeration=enumeration, default=default)
+        interpretation.symbol_decl = decl
+        interpretation.is_type_enumeration = False
+        interpretation.block = self.rules[0].block
+        problem.interpretations[decl.name] = interpretation
+        problem.derived.add(decl.name)
+        interpretation.interpret(problem)
+        problem.def_constraints.pop((decl, self), None)
+    for a in problem.assignments.values():
+        if a.symbol_decl is not None and a.symbol_decl.name in names:
+            a.is_derived = True
+    return True
+Definition.materialize = materialize
+
+
+def _positive(e: Expression, names: set[str]) -> Any:
+    """returns the ground formula `e` as a tree of conjunctions and disjunctions
+    of atoms of the predicates in `names`, or None if it is not such a formula.
+
+    The leaves of the tree are booleans and the code of the atoms;
+    the nodes are pairs (is_conjunction, [sub-trees]).
+    """
+    if e.same_as(TRUE) or e.same_as(FALSE):
+        return e.same_as(TRUE)
+    if type(e) == AppliedSymbol:
+        return (e.code if e.decl.name in names
+                and all(a.is_value() for a in e.sub_exprs) else None)
+    if type(e) == Brackets:
+        return _positive(e.sub_exprs[0], names)
+    if type(e) in [AConjunction, ADisjunction] or (type(e) == AQuantification
+                                                   and not e.quantees):
+        subs = [_positive(s, names) for s in e.sub_exprs]
+        if any(s is None for s in subs):
+            return None
+        return (type(e) == AConjunction
+                or (type(e) == AQuantification and e.q == '∀'), subs)
+    return None
+
+
+def _atoms(tree: Any) -> List[str]:
+    """returns the codes of the atoms in a tree built by `_positive`"""
+    if type(tree) == str:
+        return [tree]
+    if type(tree) == bool:
+        return []
+    return [a for sub in tree[1] for a in _atoms(sub)]
+
+
+def _holds(tree: Any, true: set[str]) -> bool:
+    """evaluates a tree built by `_positive`, given the atoms that are true"""
+    if type(tree) == str:
+        return tree in true
+    if type(tree) == bool:
+        return tree
+    is_conjunction, subs = tree
+    return (all(_holds(s, true) for s in subs) if is_conjunction else
+            any(_holds(s, true) for s in subs))
+
+
 # class Rule  ###########################################################
 
 def instantiate_definition(self: Rule,
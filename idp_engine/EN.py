@@ -145,7 +145,7 @@ def EN(self):
         and self.sub_exprs[0].operator[0] == "="):
         # ~(a=b)
         new_expr = copy(self.sub_exprs[0])
-        new_expr.operator[0] = "≠"
+        new_expr.operator = ["≠"] + new_expr.operator[1:]
         return new_expr.EN()
     op = "not" if self.operator == '¬' else self.operator
     return f"{op}({self.sub_exprs[0].EN()})"
@@ -31,9 +31,8 @@ from dateutil.relativedelta import *
 from fractions import Fraction
 from re import findall
 from sys import intern
-from textx import get_location
 from typing import (Optional, List, Union, Tuple, Set, Callable, TYPE_CHECKING,
-                    Generator, Any, Dict)
+                    Generator, Any, Dict, Hashable)
 if TYPE_CHECKING:
     from .Theory import Theory
     from .Assignments import Assignments, Status
@@ -47,8 +46,10 @@ from .utils import (unquote, OrderedSet, BOOL, INT, REAL, DATE, CONCEPT, EMPTY,
 class ASTNode(object):
     """superclass of all AST nodes
     """
+    __slots__ = ()  # the subclasses have a __dict__, unless they have slots too
 
     def location(self):
+        from textx import get_location  # deferred, as textX takes long to import
         try:
             location = get_location(self)
             location['end'] = (location['col'] +
@@ -230,6 +231,22 @@ class Accessor(ASTNode):
             acc = self.accessor
         return Accessor(parent,self.codomain.init_copy(),acc)
 
+NO_VARIABLES: frozenset = frozenset()  # shared by the expressions without variables
+_MISSING = object()  # sentinel for unset slots
+_OPERATORS: dict[Tuple[str, ...], List[str]] = {}  # shared lists of operators of Operator nodes
+_SLOT_NAMES: dict[type, Tuple[str, ...]] = {}
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    """returns the names of the slots of `cls` and of its superclasses, except `__dict__`"""
+    out = _SLOT_NAMES.get(cls, None)
+    if out is None:
+        out = tuple(name for c in cls.__mro__
+                    for name in c.__dict__.get('__slots__', ())
+                    if name != '__dict__')
+        _SLOT_NAMES[cls] = out
+    return out
+
+
 class Expression(ASTNode):
     """The abstract class of AST nodes representing (sub-)expressions.
 
@@ -242,6 +259,15 @@ class Expression(ASTNode):
         str (string)
             Textual representation of the simplified expression.
 
+            It is computed when first needed, after each change of the expression.
+
+        key (Hashable)
+            Structural key of the expression: two expressions with the same key
+            have the same textual representation.
+
+            It is derived from the keys of the sub-expressions when first needed,
+            after each change of the expression.
+
         sub_exprs (List[Expression]):
             The children of the AST node.
 
@@ -277,9 +303,17 @@ class Expression(ASTNode):
         is_type_constraint_for (string):
             name of the symbol for which the expression is a type constraint
 
-    """
-
+        is_shared (bool):
+            True if the expression is a ground atom shared by several formula
+            with the same original (see `Theory.ground_terms`).
+            It is copied before being modified (see `_change`).
 
+    The common attributes are stored in slots, to reduce the memory used by
+    large groundings; the other ones are stored in a ``__dict__``, created on first use.
+    """
+    __slots__ = ('__dict__', 'parent', 'sub_exprs', 'code', '_annotations',
+                 'original', '_str', '_key', 'variables', 'type', 'is_type_constraint_for',
+                 'is_shared', 'co_constraint', 'questions', 'relevant')
 
     def __init__(self, parent: Optional[ASTNode]=None,
                  annotations: Optional[Annotations]=None):
@@ -288,25 +322,74 @@ class Expression(ASTNode):
         self.sub_exprs: List[Expression]
 
         self.code: str = intern(str(self))
-        self.annotations: Annotation = (
-            annotations.annotations if annotations else {'reading': self.code})
+        # the default annotations are allocated on first use
+        self._annotations: Union[Annotation, str] = (
+            annotations.annotations if annotations else self.code)
         self.original: Optional[Expression] = self
 
         self.str: str = self.code
         self.variables: Optional[Set[str]] = None
         self.type: Optional[SetName] = None
         self.is_type_constraint_for: Optional[str] = None
+        self.is_shared: bool = False
         self.co_constraint: Optional[Expression] = None
 
         # attributes of the top node of a (co-)constraint
         self.questions: Optional[OrderedSet] = None
         self.relevant: Optional[bool] = None
 
+    @property
+    def str(self) -> str:
+        if self._str is None:
+            self._str = intern(str(self))
+        return self._str
+
+    @str.setter
+    def str(self, value: Optional[str]):
+        """`None` resets the textual representation"""
+        self._str = value
+        self._key = None
+
+    @property
+    def key(self) -> Hashable:
+        if self._key is None:
+            self._key = self._structural_key()
+        return self._key
+
+    def _structural_key(self) -> Hashable:
+        """returns the structural key of the expression (see `key`)"""
+        return (type(self), self.str)
+
+    @property
+    def annotations(self) -> Annotation:
+        if type(self._annotations) == str:  # the default reading
+            self._annotations = {'reading': self._annotations}
+        return self._annotations
+
+    @annotations.setter
+    def annotations(self, value: Annotation):
+        self._annotations = value
+
+    def _attributes(self) -> Generator[Tuple[str, Any], None, None]:
+        """generates the attributes of the node, in its slots and in its __dict__"""
+        for name in _slot_names(type(self)):
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                yield name, value
+        yield from self.__dict__.items()
+
+    def __copy__(self):
+        out = self.__class__.__new__(self.__class__)
+        for name, value in self._attributes():
+            setattr(out, name, value)
+        return out
+
     def __deepcopy__(self, memo):
         cls = self.__class__ # Extract the class of the object
         out = cls.__new__(cls) # Create a new instance of the object based on extracted class
         memo[id(self)] = out
-        out.__dict__.update(self.__dict__)
+        for name, value in self._attributes():
+            setattr(out, name, value)
 
         out.sub_exprs = [deepcopy(e, memo) for e in self.sub_exprs]
         out.variables = deepcopy(self.variables, memo)
@@ -323,7 +406,7 @@ class Expression(ASTNode):
 
     def same_as(self, other: Expression):
         # symmetric
-        if self.str == other.str: # and type(self) == type(other):
+        if self is other or self.str == other.str: # and type(self) == type(other):
             return True
 
         if (type(self) in [Number, Date]
@@ -505,6 +588,9 @@ class Expression(ASTNode):
                     ) -> Expression:
         raise IDPZ3Error("Internal error") # monkey-patched
 
+    def grounding_size(self, problem: Theory) -> int:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
     def substitute(self,
                    e0: Expression,
                    e1: Expression,
@@ -669,6 +755,8 @@ class AIfExpr(Expression):
     THEN = 1
     ELSE = 2
 
+    __slots__ = ('if_f', 'then_f', 'else_f')
+
     def __init__(self, parent,
                  if_f: Expression,
                  then_f: Expression,
@@ -823,7 +911,7 @@ class AQuantification(Expression):
 
         f (Expression): the formula being quantified
 
-        supersets, new_quantees, vars1: attributes used in `interpret`
+        supersets, new_quantees, vars1, plans: attributes used in `interpret`
     """
     PRECEDENCE = 20
 
@@ -849,6 +937,7 @@ class AQuantification(Expression):
         self.supersets: Optional[List[List[List[Union[Identifier, Variable]]]]] = None
         self.new_quantees: Optional[List[Quantee]] = None
         self.vars1 : Optional[List[Variable]] = None
+        self.plans: Optional[dict] = None
 
     @classmethod
     def make(cls,
@@ -1019,14 +1108,19 @@ class Operator(Expression):
     }
     EN_map: Optional[dict[str, str]] = None
 
+    __slots__ = ('operator',)
+
     def __init__(self, parent, operator, sub_exprs,
                  annotations:Optional[Annotations]=None):
         self.operator = operator
         self.sub_exprs = sub_exprs
 
-        self.operator = list(map(
-            lambda op: Operator.NORMAL.get(op, op)
-            , self.operator))
+        # the lists of operators are shared by the nodes: they must not be modified
+        key = tuple(self.operator)
+        self.operator = _OPERATORS.get(key, None)
+        if self.operator is None:
+            self.operator = [Operator.NORMAL.get(op, op) for op in key]
+            _OPERATORS[key] = self.operator
 
         super().__init__(parent, annotations=annotations)
 
@@ -1069,6 +1163,12 @@ class Operator(Expression):
         sub_ex = [q.init_copy() for q in self.sub_exprs]
         return Operator(parent,self.operator.copy(),sub_ex)
 
+    def _structural_key(self) -> Hashable:
+        if type(self).__str__ is not Operator.__str__:
+            return super()._structural_key()
+        return (type(self), tuple(self.operator[:len(self.sub_exprs)-1]),
+                tuple(e.key for e in self.sub_exprs))
+
     def __str__(self):
         def parenthesis(precedence, x):
             return f"({x.str})" if type(x).PRECEDENCE <= precedence else f"{x.str}"
@@ -1204,6 +1304,8 @@ class AUnary(Expression):
     PRECEDENCE = 120
     MAP : dict[str, Callable] = dict()  # monkey-patched
 
+    __slots__ = ('operators', 'f', 'operator')
+
     def __init__(self, parent,
                  operators: List[str],
                  f: Expression):
@@ -1260,7 +1362,7 @@ class AAggregate(Expression):
             self.sub_exprs.append(if_)
         self.annotated = False  # cannot test q_vars, because aggregate may not have quantee
         self.q = ''
-        self.supersets, self.new_quantees, self.vars1 = None, None, None
+        self.supersets, self.new_quantees, self.vars1, self.plans = None, None, None, None
         super().__init__()
 
     def init_copy(self,parent=None):
@@ -1335,6 +1437,9 @@ class AppliedSymbol(Expression):
     """
     PRECEDENCE = 200
 
+    __slots__ = ('symbol', 'is_enumerated', 'is_enumeration', 'in_enumeration',
+                 'as_disjunction', 'decl', 'in_head', 'in_temp')
+
     def __init__(self, parent,
                  symbol,
                  sub_exprs,
@@ -1381,9 +1486,15 @@ class AppliedSymbol(Expression):
         out= cls.make(SymbolExpr.make(constructor.name), args)
         out.decl = constructor
         out.type = constructor.codomain
-        out.variables = set()
+        out.variables = NO_VARIABLES
         return out
 
+    def _structural_key(self) -> Hashable:
+        if type(self).__str__ is not AppliedSymbol.__str__ or self.in_enumeration:
+            return super()._structural_key()
+        return (type(self), str(self.symbol), self.is_enumerated,
+                tuple(e.key for e in self.sub_exprs))
+
     def __str__(self):
         out = f"{self.symbol}({', '.join([x.str for x in self.sub_exprs])})"
         if self.in_enumeration:
@@ -2065,6 +2176,8 @@ class SymbolExpr(Expression):
     Either `name` and `decl`are not None, or `eval` and `s` are not None.
     When `eval` is None, `s` is None too.
     """
+    __slots__ = ('name', 'eval', 's', 'decl')
+
     def __init__(self, parent,
                  name: Optional[str],
                  eval: Optional[str],
@@ -2098,6 +2211,8 @@ class UnappliedSymbol(Expression):
     """
     PRECEDENCE = 200
 
+    __slots__ = ('name', 'decl', 'is_enumerated', 'is_enumeration', 'in_enumeration')
+
     def __init__(self, parent: Optional[ASTNode], name: str):
         self.name = unquote(name)
 
@@ -2119,7 +2234,7 @@ class UnappliedSymbol(Expression):
         out = (cls)(None, name=constructor.name)
         out.decl = constructor
         out.type = constructor.codomain
-        out.variables = set()
+        out.variables = NO_VARIABLES
         return out
 
     def is_value(self): return True
@@ -2147,6 +2262,8 @@ class Variable(Expression):
     """
     PRECEDENCE = 200
 
+    __slots__ = ('name',)
+
     def __init__(self, parent,
                  name:str,
                  type: Optional[SetName]=None):
@@ -2182,13 +2299,15 @@ def VARIABLE(name: str, type: SetName):
 class Number(Expression):
     PRECEDENCE = 200
 
+    __slots__ = ('number', 'py_value', 'decl')
+
     def __init__(self, **kwargs):
         self.number = kwargs.pop('number')
 
         super().__init__()
 
         self.sub_exprs = []
-        self.variables = set()
+        self.variables = NO_VARIABLES
         self.py_value = 0 # to get the type
 
         ops = self.number.split("/")
@@ -2240,7 +2359,7 @@ class Date(Expression):
         super().__init__()
 
         self.sub_exprs = []
-        self.variables = set()
+        self.variables = NO_VARIABLES
 
         self.py_value = int(self.date.toordinal())
         self.type = DATE_SETNAME
@@ -26,20 +26,44 @@ import argparse
 import os
 import sys
 import time
+from typing import List
 
 from idp_engine import IDP
 from z3 import set_option
-from idp_engine.utils import PROCESS_TIMINGS
+from idp_engine.utils import PROCESS_TIMINGS, VERSION
 
 
 def cli(args=None):
     parser = argparse.ArgumentParser(description='IDP-Z3')
-    parser.add_argument('--version', '-v', action='version', version='0.10.12')
+    parser.add_argument('--version', '-v', action='version', version=VERSION)
     parser.add_argument('FILE', help='path to the .idp file', type=str)
     parser.add_argument('-o', '--output', help='name of the output file',
                         type=str)
     parser.add_argument('--full-formula', help='show the full formula',
                         dest='formula', action='store_true')
+    parser.add_argument('--cache-dir',
+                        help='directory of the cache of parsed programs and of their groundings',
+                        dest='cache_dir', type=str, default=None)
+    parser.add_argument('--grounding',
+                        help='grounding of the quantifications over enumerated types',
+                        dest='grounding', choices=['full', 'lifted', 'auto'],
+                        default='full')
+    parser.add_argument('--grounding-budget',
+                        help='maximum estimated number of atoms in the grounding of a theory',
+                        dest='budget', type=int, default=None)
+    parser.add_argument('--grounding-workers',
+                        help='number of processes grounding the constraints (0: one per CPU)',
+                        dest='workers', type=int, default=1)
+    parser.add_argument('--function-tables',
+                        help='minimum size of the function interpretations translated as tables',
+                        dest='tables', metavar='SIZE', type=int, default=None)
+    parser.add_argument('--type-constraints',
+                        help='constrain the values of functions per instance or per symbol',
+                        dest='type_constraints', choices=['instance', 'sort'],
+                        default='instance')
+    parser.add_argument('--grounding-size',
+                        help='show the estimated number of atoms in the grounding',
+                        dest='grounding_size', action='store_true')
     parser.add_argument('--no-timing',
                         help='don\'t display timing information',
                         dest='timing', action='store_false',
@@ -55,11 +79,14 @@ def cli(args=None):
     if args.FILE:
         dir = os.getcwd()
         file = os.path.join(dir, args.FILE)
-        with open(file, "r") as f:
-            theory = f.read()
 
         parse_start = time.time()
-        idp = IDP.from_str(theory)
+        idp = IDP.from_file(file, cache_dir=args.cache_dir)
+        sizes: List[int] = []  # of the groundings
+        idp.options = {'strategy': args.grounding, 'budget': args.budget,
+                       'workers': args.workers or os.cpu_count() or 1,
+                       'tables': args.tables, 'type_constraints': args.type_constraints,
+                       'sizes': sizes}
         PROCESS_TIMINGS['parse'] = time.time() - parse_start
         if not args.output:
             # Print output to stdout.
@@ -84,6 +111,8 @@ def cli(args=None):
                   f" (Parse: {round(PROCESS_TIMINGS['parse'], 4)}s"
                   f" | Ground: {round(PROCESS_TIMINGS['ground'], 4)}s"
                   f" | Solve: {round(PROCESS_TIMINGS['solve'], 4)}s)")
+        if args.grounding_size:
+            print(f"Grounding size: ~{sizes[-1] if sizes else 0} atoms")
     else:
         parser.print_help()
 
@@ -27,10 +27,13 @@ from __future__ import annotations
 from copy import copy
 from fractions import Fraction
 from typing import TYPE_CHECKING, List
-from z3 import (Z3Exception, Datatype, DatatypeRef, ExprRef, Function,
+from z3 import (Z3Exception, Datatype, DatatypeRef, ExprRef, BoolRef, Function,
                 RecFunction, Const, FreshConst, BoolSort, IntSort, RealSort,
                 Or, Not, And, ForAll, Exists, Sum, If, BoolVal, RatVal, IntVal,
-                RecAddDefinition)
+                RecAddDefinition, Context, FuncDeclRef, Z3_mk_and, Z3_mk_or,
+                Z3_mk_not, Z3_mk_eq, Z3_mk_distinct, Z3_mk_app, Z3_get_ast_kind,
+                Z3_get_decl_kind, Z3_get_app_decl, Z3_APP_AST, Z3_OP_UNINTERPRETED)
+from z3.z3 import _to_ast_array, _to_expr_ref
 
 from .Parse import (TypeDeclaration, SymbolDeclaration, TupleIDP, Ranges,
                     IntRange, RealRange, DateRange)
@@ -46,6 +49,74 @@ from .utils import (BOOL,
 if TYPE_CHECKING:
     from .Theory import Theory
 
+
+# Bulk construction  ###########################################################
+
+# The Z3 terms of large ground theories are built with the C API of Z3,
+# without the checks and coercions of the z3py wrappers (e.g., `And`, `==`):
+# the expressions have been type-checked, and the C API coerces integers to reals.
+# The z3py wrappers are used for the terms that are not Z3 expressions,
+# and give the same Z3 terms.
+
+def _mk_bool(mk, args: List[BoolRef], ctx: Context) -> BoolRef:
+    array, size = _to_ast_array(args)
+    return BoolRef(mk(ctx.ref(), size, array), ctx)
+
+
+def _and(args: List[ExprRef], ctx: Context) -> BoolRef:
+    if all(isinstance(a, BoolRef) for a in args):
+        return _mk_bool(Z3_mk_and, args, ctx)
+    return And(args)
+
+
+def _or(args: List[ExprRef], ctx: Context) -> BoolRef:
+    if all(isinstance(a, BoolRef) for a in args):
+        return _mk_bool(Z3_mk_or, args, ctx)
+    return Or(args)
+
+
+def _not(arg: ExprRef, ctx: Context) -> BoolRef:
+    if isinstance(arg, BoolRef):
+        return BoolRef(Z3_mk_not(ctx.ref(), arg.as_ast()), ctx)
+    return Not(arg)
+
+
+def _eq(x: ExprRef, y: ExprRef, ctx: Context) -> BoolRef:
+    if isinstance(x, ExprRef) and isinstance(y, ExprRef):
+        return BoolRef(Z3_mk_eq(ctx.ref(), x.as_ast(), y.as_ast()), ctx)
+    return x == y
+
+
+def _ne(x: ExprRef, y: ExprRef, ctx: Context) -> BoolRef:
+    if isinstance(x, ExprRef) and isinstance(y, ExprRef):
+        return _mk_bool(Z3_mk_distinct, [x, y], ctx)
+    return x != y
+
+
+def _app(function: FuncDeclRef, args: List[ExprRef], ctx: Context) -> ExprRef:
+    if all(isinstance(a, ExprRef) for a in args):
+        array, size = _to_ast_array(args)
+        return _to_expr_ref(Z3_mk_app(ctx.ref(), function.ast, size, array), ctx)
+    return function(args)
+
+
+def decl_kind(e: ExprRef) -> int:
+    """Returns the kind of the declaration of the application `e`
+    (e.g., `Z3_OP_AND`), or `Z3_OP_UNINTERPRETED` if `e` is not an application"""
+    ctx_ref, ast = e.ctx.ref(), e.as_ast()
+    if Z3_get_ast_kind(ctx_ref, ast) != Z3_APP_AST:
+        return Z3_OP_UNINTERPRETED
+    return Z3_get_decl_kind(ctx_ref, Z3_get_app_decl(ctx_ref, ast))
+
+
+# the operators built with the C API, in addition to Operator.MAP
+_MK = {'⇒': lambda x, y, ctx: _or([_not(x, ctx), y], ctx),
+      '⇐': lambda x, y, ctx: _or([x, _not(y, ctx)], ctx),
+      '⇔': _eq,
+      '=': _eq,
+      '≠': _ne
+      }
+
 # class TypeDeclaration  ###########################################################
 
 def translate(self, problem: Theory) -> ExprRef:
@@ -212,13 +283,13 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
     forms = [f.translate(problem, all_vars) for f in self.sub_exprs]
 
     if self.q == '∀':
-        forms = (And(forms) if 1 < len(forms) else
+        forms = (_and(forms, problem.ctx) if 1 < len(forms) else
                  forms[0]   if 1 == len(forms) else
                  BoolVal(True, problem.ctx))
         if local_vars:
             forms = ForAll(list(local_vars.values()), forms)
     else:
-        forms = (Or(forms) if 1 < len(forms) else
+        forms = (_or(forms, problem.ctx) if 1 < len(forms) else
                  forms[0]  if 1 == len(forms) else
                  BoolVal(False, problem.ctx))
         if local_vars:
@@ -253,11 +324,12 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
     out = self.sub_exprs[0].translate(problem, vars)
 
     for i in range(1, len(self.sub_exprs)):
-        function = Operator.MAP[self.operator[i - 1]]
-        try:
-            out = function(out, self.sub_exprs[i].translate(problem, vars))
-        except Exception as e:
-            raise e
+        y = self.sub_exprs[i].translate(problem, vars)
+        mk = _MK.get(self.operator[i - 1], None)
+        if mk:
+            out = mk(out, y, problem.ctx)
+        else:
+            out = Operator.MAP[self.operator[i - 1]](out, y)
     return out
 Operator.translate1 = translate1
 
@@ -268,7 +340,7 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
     if len(self.sub_exprs) == 1:
         out = self.sub_exprs[0].translate(problem, vars)
     else:
-        out = Or([e.translate(problem, vars) for e in self.sub_exprs])
+        out = _or([e.translate(problem, vars) for e in self.sub_exprs], problem.ctx)
     return out
 ADisjunction.translate1 = translate1
 
@@ -279,7 +351,7 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
     if len(self.sub_exprs) == 1:
         out = self.sub_exprs[0].translate(problem, vars)
     else:
-        out = And([e.translate(problem, vars) for e in self.sub_exprs])
+        out = _and([e.translate(problem, vars) for e in self.sub_exprs], problem.ctx)
     return out
 AConjunction.translate1 = translate1
 
@@ -293,16 +365,18 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
     for i in range(1, len(self.sub_exprs)):
         x = self.sub_exprs[i-1].translate(problem, vars)
         assert x is not None, f"Internal error: {x} is None"
-        function = Operator.MAP[self.operator[i - 1]]
         y = self.sub_exprs[i].translate(problem, vars)
         assert y is not None, f"Internal error: {y} is None"
         try:
-            out = out + [function(x, y)]
+            if self.operator[i - 1] == '=':
+                out.append(_eq(x, y, problem.ctx))
+            else:
+                out.append(Operator.MAP[self.operator[i - 1]](x, y))
         except Z3Exception as e:
             self.check(False,
                        "{}:{}{}{}".format(str(e),str(x), self.operator[i - 1], str(y)))
     if 1 < len(out):
-        return And(out)
+        return _and(out, problem.ctx)
     else:
         return out[0]
 AComparison.translate1 = translate1
@@ -316,6 +390,8 @@ AUnary.MAP = {'-': lambda x: 0 - x,
 
 def translate1(self, problem: Theory, vars={}) -> ExprRef:
     out = self.sub_exprs[0].translate(problem, vars)
+    if self.operator == '¬':
+        return _not(out, problem.ctx)
     function = AUnary.MAP[self.operator]
     try:
         return function(out)
@@ -359,7 +435,7 @@ def translate1(self, problem: Theory, vars={}) -> ExprRef:
         arg = [x.translate(problem, vars) for x in self.sub_exprs]
         # assert  all(a != None for a in arg)
         try:
-            return (self.decl.translate(problem))(arg)
+            return _app(self.decl.translate(problem), arg, problem.ctx)
         except:
             if self.original.code.startswith('$'):
                 msg = f"$()() expression is not properly guarded: {self.original.code}"
@@ -33,19 +33,23 @@ This module monkey-patches the ASTNode class and sub-classes.
 from __future__ import annotations
 
 from copy import copy, deepcopy
+from functools import partial
 from itertools import product
-from typing import List, Callable, Optional
+from math import prod
+from typing import List, Callable, Optional, Tuple
 
 from .Assignments import Status as S
 from .Parse import (Import, TypeDeclaration, SymbolDeclaration,
                     SymbolInterpretation, FunctionEnum, Enumeration, TupleIDP,
-                    ConstructedFrom, Definition)
+                    ConstructedFrom, Definition, Ranges)
 from .Expression import (AIfExpr, IF,
                          SymbolExpr, Expression, Constructor, AQuantification,
                          SetName, FORALL, IMPLIES, AND, AAggregate,
+                         AImplication, AConjunction,
                          AppliedSymbol, UnappliedSymbol, Quantee, Variable,
                          VARIABLE, TRUE, FALSE, Number, Extension,
-                         BOOL_SETNAME,)
+                         AComparison, OR, EQUALS,
+                         BOOL_SETNAME, INT_SETNAME, DATE_SETNAME)
 from .Theory import Theory
 from .utils import (BOOL, RESERVED_SYMBOLS, CONCEPT, OrderedSet, DEFAULT,
                     GOAL_SYMBOL, EXPAND, flatten)
@@ -109,6 +113,15 @@ TypeDeclaration.interpret = interpret
 
 # class SymbolDeclaration  ###########################################################
 
+def _filter(self: SymbolDeclaration, filters: List[Optional[Callable]], args):
+    """the filter of the extension of predicate `self`"""
+    out = AND([f([deepcopy(t)]) if f is not None else TRUE
+                for f, t in zip(filters, args)])
+    if self.codomain == BOOL_SETNAME:
+        out = AND([out, deepcopy(AppliedSymbol.make(self.symbol_expr, args, type_check=False))])
+    return out
+
+
 def interpret(self: SymbolDeclaration, problem: Theory):
     assert all(isinstance(s, SetName) for s in self.domains), 'internal error'
 
@@ -126,13 +139,8 @@ def interpret(self: SymbolDeclaration, problem: Theory):
         else:
             superset = list(product(*([ee[0] for ee in e[0]] for e in extensions)))
 
-    filters = [e[1] for e in extensions]
-    def filter(args):
-        out = AND([f([deepcopy(t)]) if f is not None else TRUE
-                    for f, t in zip(filters, args)])
-        if self.codomain == BOOL_SETNAME:
-            out = AND([out, deepcopy(AppliedSymbol.make(self.symbol_expr, args, type_check=False))])
-        return out
+    # a partial function rather than a closure, to allow pickling the extension
+    filter = partial(_filter, self, [e[1] for e in extensions])
 
     if self.codomain == BOOL_SETNAME:
         problem.extensions[self.name] = (superset, filter)
@@ -156,7 +164,12 @@ def interpret(self: SymbolDeclaration, problem: Theory):
         problem.interpretations[self.name].interpret(problem)
     
     # create type constraints
-    if type(self.instances) == dict and self.codomain != BOOL_SETNAME:
+    if (type(self.instances) == dict and self.codomain != BOOL_SETNAME
+        and problem.type_constraints == "sort" and not problem.extended):
+        constraint = _sort_constraint(self, filter, problem)
+        if constraint is not None:
+            problem.sort_constraints[self.name] = constraint
+    elif type(self.instances) == dict and self.codomain != BOOL_SETNAME:
         for expr in self.instances.values():
             # add type constraints to problem.constraints
             # ! (x,y) in domain: range(f(x,y))
@@ -172,6 +185,32 @@ def interpret(self: SymbolDeclaration, problem: Theory):
 SymbolDeclaration.interpret = interpret
 
 
+def _sort_constraint(self: SymbolDeclaration, filter: Callable, problem: Theory
+                     ) -> Optional[Expression]:
+    """returns the type constraint of `self` for all its instances at once,
+    e.g., `∀ x ∈ T: f(x) ∈ range`, or None if it is not needed.
+
+    The quantification is not expanded in the constraints of the problem:
+    it is instantiated for each instance of `self` after its translation to Z3.
+    """
+    if not self.instances:
+        return None
+    vars = [VARIABLE(f"x{i}", domain) for i, domain in enumerate(self.domains)]
+    expr = AppliedSymbol.make(self.symbol_expr, vars, type_check=False)
+    guard = (_range_guard(self.codomain)
+             if type(self.codomain.decl) == TypeDeclaration else None)
+    range_condition = (guard([expr]) if guard is not None else
+                       self.codomain.has_element(expr, problem.extensions))
+    if range_condition.same_as(TRUE):
+        return None
+    constraint = IMPLIES([filter(vars), range_condition])
+    if vars:
+        constraint = FORALL([Quantee.make(v, sort=v.type) for v in vars], constraint)
+    constraint.is_type_constraint_for = self.name
+    constraint.annotations['reading'] = f"Possible values for {expr}"
+    return constraint
+
+
 # class Definition  ###########################################################
 
 def interpret(self: Definition, problem: Theory):
@@ -182,10 +221,19 @@ def interpret(self: Definition, problem: Theory):
             containts the enumerations for the expansion; is updated with the expanded definitions
     """
     self.cache = {}  # reset the cache
-    problem.def_constraints.update(self.get_def_constraints(problem))
+    if not self.materialize(problem):
+        problem.def_constraints.update(self.get_def_constraints(problem))
 Definition.interpret = interpret
 
 
+def grounding_size(self: Definition, problem: Theory) -> int:
+    """returns an upper bound of the number of atoms in the grounding of the definition"""
+    return sum(_domain_size(rule.quantees, problem, problem.grounding == "lifted")
+               * (1 + rule.body.grounding_size(problem))
+               for rules in self.canonicals.values() for rule in rules)
+Definition.grounding_size = grounding_size
+
+
 # class SymbolInterpretation  ###########################################################
 
 def interpret(self: SymbolInterpretation, problem: Theory):
@@ -217,6 +265,13 @@ def interpret(self: SymbolInterpretation, problem: Theory):
                             for t in enumeration.sorted_tuples)
         enumeration.lookup = lookup
 
+        # translate large function interpretations as tables
+        if (type(enumeration) == FunctionEnum and status == S.STRUCTURE
+            and problem.table_size is not None
+            and problem.table_size <= len(enumeration.tuples)
+            and (self.default is None or decl.instances)):
+            problem.tables.add(self.name)
+
         # update problem.assignments with data from enumeration
         for t in enumeration.tuples:
 
@@ -382,7 +437,7 @@ def _prepare_interpret(self: Expression,
         _prepare_interpret(e, problem, subs)
 
     if isinstance(self, AQuantification) or isinstance(self, AAggregate):
-        get_supersets(self, problem)
+        get_supersets(self, problem, lifted=_is_lifted(self, problem))
 
 
 
@@ -391,8 +446,7 @@ def clone_when_necessary(func):
         if self.is_value():
             return self
         if subs:
-            self = copy(self)  # shallow copy !
-            self.annotations = copy(self.annotations)
+            self = copy(self)  # shallow copy ! the annotations are replaced by _finalize
         out = func(self, problem, subs)
         return out
     return inner_function
@@ -422,11 +476,25 @@ def _interpret(self: Expression,
     return out
 Expression._interpret = _interpret
 
+def grounding_size(self: Expression, problem: Theory) -> int:
+    """returns an upper bound of the number of atoms in the grounding of self,
+    given the extensions of the types and predicates in `problem`.
+
+    The estimate is computed before grounding, without simplification.
+    """
+    return max(1, sum(e.grounding_size(problem) for e in self.sub_exprs))
+Expression.grounding_size = grounding_size
+
+
 def _finalize(self: Expression, subs: dict[str, Expression]):
     """update self.variables and reading"""
     if subs:
-        self.code = str(self)
-        self.annotations['reading'] = self.code
+        if self._str is None:  # changed since its last rendering
+            self.code = self.str
+        if type(self._annotations) == str:  # the default reading
+            self._annotations = self.code
+        else:
+            self.annotations = {**self.annotations, 'reading': self.code}
     return self
 
 
@@ -469,11 +537,16 @@ SetName.extension = extension
 
 # Class AQuantification  ######################################################
 
-def get_supersets(self: AQuantification | AAggregate, problem: Optional[Theory]):
+def get_supersets(self: AQuantification | AAggregate, problem: Optional[Theory],
+                  lifted: bool = False):
     """determine the extent of the variables, if possible,
     and add a filter to the quantified expression if needed.
     This is used to ground quantification over unary predicates.
 
+    When `lifted` is True, the variables over enumerated types are not
+    expanded: they remain quantified in the Z3 formula,
+    with a filter restricting them to the range, if needed.
+
     Example:
         type T := {1,2,3}
         p : T -> Bool  // p is a subset of T
@@ -492,6 +565,7 @@ def get_supersets(self: AQuantification | AAggregate, problem: Optional[Theory])
         `self.sub_exprs` are updated with the appropriate filters
     """
     self.new_quantees, self.vars1, self.supersets = [], [], []
+    self.plans = {}
     for q in self.quantees:
         domain = q.sub_exprs[0]
 
@@ -513,6 +587,9 @@ def get_supersets(self: AQuantification | AAggregate, problem: Optional[Theory])
 
         assert hasattr(domain, "decl"), "Internal error"
         arity = domain.decl.arity
+        lift = lifted and filter is None and _is_liftable(domain)
+        if lift:
+            superset, filter = None, _range_guard(domain)
         for vars in q.vars:
             self.check(len(vars) == arity, f"Incorrect arity for {domain}")
             if problem and filter:
@@ -528,6 +605,39 @@ def get_supersets(self: AQuantification | AAggregate, problem: Optional[Theory])
             self.supersets.extend([superset]*len(q.vars))
 
 
+def _is_lifted(self: AQuantification | AAggregate, problem: Optional[Theory]) -> bool:
+    """True if the quantification should not be expanded by `problem`"""
+    return (type(self) == AQuantification and problem is not None
+            and problem.grounding == "lifted")
+
+
+def _is_liftable(domain: Expression) -> bool:
+    """True if the quantification over `domain` can be kept in the Z3 formula,
+    i.e., if `domain` is a type made of nullary constructors,
+    or a range of integers or dates"""
+    decl = domain.decl if isinstance(domain, SetName) else None
+    if type(decl) != TypeDeclaration or decl.name in [BOOL, CONCEPT]:
+        return False
+    if decl.constructors:
+        return all(not c.domains for c in decl.constructors)
+    enumeration = getattr(decl.interpretation, 'enumeration', None)
+    return (type(enumeration) == Ranges and bool(enumeration.elements)
+            and enumeration.type in [INT_SETNAME, DATE_SETNAME])
+
+
+def _range_guard(domain: SetName) -> Optional[Callable]:
+    """returns the filter restricting a variable to a range type, if any"""
+    enumeration = getattr(domain.decl.interpretation, 'enumeration', None)
+    if type(enumeration) != Ranges:
+        return None
+
+    def guard(args: List[Expression]) -> Expression:
+        return OR([EQUALS([args[0], x.fromI]) if x.toI is None else
+                   AComparison.make('≤', [x.fromI, args[0], x.toI])
+                   for x in enumeration.elements])
+    return guard
+
+
 def _add_filter(q: str, expr: Expression, filter: Callable, args: List[Variable],
                 theory: Theory) -> Expression:
     """add `filter(args)` to `expr` quantified by `q`
@@ -558,6 +668,145 @@ def _add_filter(q: str, expr: Expression, filter: Callable, args: List[Variable]
     return out
 
 
+def _guards(q: str, expr: Expression) -> List[AppliedSymbol]:
+    """returns the atoms that must be true for an instance of `expr`
+    to matter in a quantification `q`, i.e.,
+    the conjuncts of the antecedents of `∀ x: a ∧ b ⇒ c`,
+    or the conjuncts of `∃ x: a ∧ b`
+    """
+    conjuncts = []
+    if q == '∀':
+        while type(expr) == AImplication and len(expr.sub_exprs) == 2:
+            antecedent = expr.sub_exprs[0]
+            conjuncts.extend(antecedent.sub_exprs if type(antecedent) == AConjunction
+                             else [antecedent])
+            expr = expr.sub_exprs[1]
+    elif q == '∃':
+        conjuncts = expr.sub_exprs if type(expr) == AConjunction else [expr]
+    return [e for e in conjuncts if type(e) == AppliedSymbol]
+
+
+def _relation(atom: AppliedSymbol, problem: Theory) -> Optional[List[List[Expression]]]:
+    """returns the tuples of the predicate of `atom`,
+    if the predicate is false for any other tuple"""
+    decl = atom.decl
+    if (atom.is_enumerated or atom.in_enumeration
+        or type(decl) != SymbolDeclaration or decl.codomain != BOOL_SETNAME):
+        return None
+    interpretation = problem.interpretations.get(decl.name, None)
+    if (interpretation is None or interpretation.block.name == DEFAULT
+        or type(interpretation.enumeration) == FunctionEnum
+        or interpretation.default is None
+        or not interpretation.default.same_as(FALSE)):
+        return None
+    return [t.args for t in interpretation.enumeration.tuples]
+
+
+def _plan(self: AQuantification,
+          f: Expression,
+          problem: Theory,
+          subs: dict[str, Expression]
+          ) -> Optional[List[List[Tuple[dict, List]]]]:
+    """returns a plan to ground `f` over the tuples of values
+    that satisfy its guards, or None if it has no usable guard.
+
+    The guards are enumerated predicates, i.e., relations.
+    The plan is a hash join of the relations with the supersets of the variables:
+    for each group of variables (i.e., each superset), it gives a list of
+    `(index, key)`, where `index` maps the values of the variables bound earlier
+    (given by `key`) to the positions of the acceptable values in the superset.
+
+    Example:
+        `!x, y in T: edge(x, y) => color(x) ~= color(y).` is grounded
+        over the tuples of `edge` only, not over the product of T by T.
+    """
+    groups = self.supersets
+    if not groups or any(not g for g in groups):
+        return None
+    var_pos, i, k = {}, 0, 0  # var.code -> (group, position in group)
+    for var in self.vars1:
+        while k == len(groups[i][0]):
+            i, k = i + 1, 0
+        var_pos[var.code] = (i, k)
+        k += 1
+
+    plan: List[List[Tuple[dict, List]]] = [[] for _ in groups]
+    for atom in _guards(self.q, f):
+        relation = _relation(atom, problem)
+        if relation is None:
+            continue
+        refs: dict = {}  # group position or outer variable -> argument ranks
+        consts = []  # (argument rank, value)
+        for rank, arg in enumerate(atom.sub_exprs):
+            if type(arg) == Variable and arg.code in var_pos:
+                refs.setdefault(var_pos[arg.code], []).append(rank)
+            elif type(arg) == Variable and arg.code in subs and subs[arg.code].is_value():
+                refs.setdefault(arg.code, []).append(rank)
+            elif arg.is_value():
+                consts.append((rank, arg.code))
+            else:
+                break
+        else:
+            grps = [ref[0] for ref in refs if type(ref) == tuple]
+            if not grps or any(type(groups[g][0][0]) == Variable for g in grps):
+                continue  # not a guard for the expanded variables
+            depth = max(grps)
+            own = sorted(ref[1] for ref in refs
+                         if type(ref) == tuple and ref[0] == depth)
+            key = [ref for ref in refs if type(ref) != tuple or ref[0] < depth]
+
+            positions: dict = {}  # values of own variables -> positions in superset
+            for pos, vals in enumerate(groups[depth]):
+                positions.setdefault(tuple(vals[k].code for k in own), []).append(pos)
+            index: dict = {}
+            for args in relation:
+                codes = [a.code for a in args]
+                if (all(codes[rank] == code for rank, code in consts)
+                    and all(codes[r] == codes[ranks[0]]
+                            for ranks in refs.values() for r in ranks)):
+                    found = positions.get(tuple(codes[refs[(depth, k)][0]] for k in own))
+                    if found:
+                        index.setdefault(tuple(codes[refs[ref][0]] for ref in key),
+                                         []).extend(found)
+            for found in index.values():
+                found.sort()
+            plan[depth].append((index, key))
+    return plan if any(plan) else None
+
+
+def _join(plan: Optional[List[List[Tuple[dict, List]]]],
+          groups: List[List[List[Expression]]],
+          subs: dict[str, Expression]):
+    """yields the tuples of values of the supersets in `groups` selected by `plan`,
+    in the order of `product(*groups)`"""
+    if plan is None or not all(ref in subs and subs[ref].is_value()
+                               for step in plan for _, key in step
+                               for ref in key if type(ref) == str):
+        yield from product(*groups)
+        return
+
+    binding: List[List[Expression]] = [None] * len(groups)
+    def join(depth):
+        if depth == len(groups):
+            yield tuple(binding)
+            return
+        if not plan[depth]:
+            selected = range(len(groups[depth]))
+        else:
+            found = [index.get(tuple(binding[ref[0]][ref[1]].code if type(ref) == tuple
+                                     else subs[ref].code
+                                     for ref in key), [])
+                     for index, key in plan[depth]]
+            selected = min(found, key=len)
+            if 1 < len(found):
+                others = [set(f) for f in found if f is not selected]
+                selected = [p for p in selected if all(p in o for o in others)]
+        for pos in selected:
+            binding[depth] = groups[depth][pos]
+            yield from join(depth + 1)
+    yield from join(0)
+
+
 @clone_when_necessary
 def _interpret(self: AQuantification | AAggregate,
                problem: Optional[Theory],
@@ -580,14 +829,20 @@ def _interpret(self: AQuantification | AAggregate,
         # interpret quantees
         for q in self.quantees: # for !x in $(output_domain(s,1))
             q.sub_exprs = [e._interpret(problem, subs) for e in q.sub_exprs]
-        get_supersets(self, problem)
+        get_supersets(self, problem, lifted=_is_lifted(self, problem))
 
     assert self.new_quantees is not None and self.vars1 is not None, "Internal error"
     self.quantees = self.new_quantees
     # expand the formula by the cross-product of the supersets, and substitute per `subs`
     forms, subs1 = [], copy(subs)
-    for f in self.sub_exprs:
-        for vals in product(*self.supersets):
+    for i, f in enumerate(self.sub_exprs):
+        if problem and type(self) == AQuantification:
+            if i not in self.plans:
+                self.plans[i] = _plan(self, f, problem, subs)
+            vals_list = _join(self.plans[i], self.supersets, subs)
+        else:
+            vals_list = product(*self.supersets)
+        for vals in vals_list:
             vals1 = flatten(vals)
             subs1.update((var.code, val) for var, val in zip(self.vars1, vals1))
             new_f2 = f._interpret(problem, subs1)
@@ -598,6 +853,57 @@ def _interpret(self: AQuantification | AAggregate,
 AQuantification._interpret = _interpret
 
 
+def grounding_size(self: AQuantification | AAggregate, problem: Theory) -> int:
+    lifted = _is_lifted(self, problem)
+    if type(self) != AQuantification or len(self.sub_exprs) != 1:
+        return (_domain_size(self.quantees, problem, lifted)
+                * Expression.grounding_size(self, problem))
+
+    # `∀ x: ∀ y: p(x, y) ⇒ q` is grounded like `∀ x, y: p(x, y) ⇒ q`
+    quantees, body = list(self.quantees), self.sub_exprs[0]
+    while (type(body) == AQuantification and body.q == self.q
+           and len(body.sub_exprs) == 1):
+        quantees.extend(body.quantees)
+        body = body.sub_exprs[0]
+
+    # the instances are restricted by the guards
+    size = _domain_size(quantees, problem, lifted)
+    var_sizes = {var.code: _superset_size(q, problem, lifted)
+                 for q in quantees if len(q.vars[0]) == 1
+                 for var in flatten(q.vars)}
+    others = _domain_size([q for q in quantees if len(q.vars[0]) != 1],
+                          problem, lifted)
+    for atom in _guards(self.q, body):
+        relation = _relation(atom, problem)
+        if relation is not None:
+            covered = set(a.code for a in atom.sub_exprs if a.code in var_sizes)
+            size = min(size, len(relation) * others
+                             * prod(n for c, n in var_sizes.items() if c not in covered))
+    return size * body.grounding_size(problem)
+AQuantification.grounding_size = grounding_size
+AAggregate.grounding_size = grounding_size
+
+
+def _domain_size(quantees: List[Quantee], problem: Theory, lifted: bool) -> int:
+    """returns the number of tuples of values of the variables in `quantees`"""
+    return prod(_superset_size(q, problem, lifted) ** len(q.vars) for q in quantees)
+
+
+def _superset_size(q: Quantee, problem: Theory, lifted: bool) -> int:
+    """returns the size of the superset of the domain of `q`,
+    or 1 if its variables are not expanded"""
+    domain = q.sub_exprs[0]
+    if isinstance(domain, SetName):
+        (superset, filter) = domain.extension(problem.extensions)
+    elif type(domain) == SymbolExpr and domain.decl:
+        (superset, filter) = problem.extensions.get(domain.decl.name, (None, None))
+    else:
+        return 1
+    if superset is None or (lifted and filter is None and _is_liftable(domain)):
+        return 1
+    return len(superset)
+
+
 # Class AAggregate  ######################################################
 
 @clone_when_necessary
@@ -612,6 +918,17 @@ AAggregate._interpret = _interpret
 
 # Class AppliedSymbol  ##############################################
 
+def grounding_size(self: AppliedSymbol, problem: Theory) -> int:
+    out = Expression.grounding_size(self, problem)
+    if (problem.grounding == "lifted" and self.decl
+        and self.decl.name in problem.interpretations
+        and any(e.variables for e in self.sub_exprs)):
+        # the interpretation is applied to variables: an if-then-else over its tuples
+        out += len(problem.interpretations[self.decl.name].enumeration.tuples)
+    return out
+AppliedSymbol.grounding_size = grounding_size
+
+
 @clone_when_necessary
 def _interpret(self: AppliedSymbol,
                problem: Optional[Theory],
@@ -637,6 +954,19 @@ def _interpret(self: AppliedSymbol,
     if out.is_value():
         return out
 
+    # share the ground atoms created by the expansion of quantifiers
+    key = out.key
+    shared = (subs and problem and not out.in_head and not out.has_variables())
+    if shared and key in problem.ground_terms:
+        cached = problem.ground_terms[key]
+        if cached.original is out.original and cached._annotations == out._annotations:
+            return cached
+        # an occurrence from another source: same interpretation, but its own origin
+        cached = copy(cached)
+        cached.is_shared = False
+        cached.original, cached._annotations = out.original, out._annotations
+        return cached
+
     # interpret the AppliedSymbol
     value, co_constraint = None, None
     if out.decl and problem:
@@ -662,7 +992,9 @@ def _interpret(self: AppliedSymbol,
             out.as_disjunction.annotations = out.annotations
         elif out.decl.name in problem.interpretations:
             interpretation = problem.interpretations[out.decl.name]
-            if interpretation.block.name != DEFAULT:
+            if (interpretation.block.name != DEFAULT
+                and (out.decl.name not in problem.tables
+                     or all(e.is_value() for e in sub_exprs))):
                 f = interpretation.interpret_application
                 value = f(0, out, sub_exprs)
         if not out.in_head:
@@ -677,6 +1009,9 @@ def _interpret(self: AppliedSymbol,
 
         out = (value if value else
                out._change(sub_exprs=sub_exprs, co_constraint=co_constraint))
+        if shared and not value:
+            out.is_shared = True
+            problem.ground_terms[key] = out
     return out
 AppliedSymbol._interpret = _interpret
 
@@ -22,14 +22,24 @@ Classes to parse an IDP-Z3 theory.
 """
 from __future__ import annotations
 
+from collections import OrderedDict
 from copy import copy, deepcopy
 from datetime import date
 from enum import Enum
+import glob
+from hashlib import sha256
 from itertools import groupby, product
+import io
+import os
 from os import path
+import pickle
+import re
+import stat
+import sys
 from sys import intern
-from textx import metamodel_from_file
-from typing import Any, Tuple, List, Union, Optional, TYPE_CHECKING
+import threading
+from typing import Any, Callable, IO, Tuple, List, Union, Optional, TYPE_CHECKING
+from z3 import AstRef, Context
 
 
 
@@ -42,13 +52,14 @@ from .Expression import (VARIABLE, AFFormula, AGFormula, AUFormula, AXFormula, A
                          ASumMinus, AMultDiv, APower, AUnary, AAggregate,
                          AppliedSymbol, UnappliedSymbol, Number, Brackets,
                          Date, Extension, Identifier, Variable, TRUEC, FALSEC,
-                         TRUE, FALSE, EQUALS, AND, OR,
+                         TRUE, FALSE, ZERO, ONE, EQUALS, AND, OR,
                          BOOL_SETNAME, INT_SETNAME, REAL_SETNAME, DATE_SETNAME, EMPTY_SETNAME)
 from .utils import (RESERVED_SYMBOLS, TIJD, OrderedSet, NEWL, BOOL, INT, REAL, DATE,
                     CONCEPT, GOAL_SYMBOL, EXPAND, RELEVANT, ABS, IDPZ3Error,
                     MAX_QUANTIFIER_EXPANSION, Semantics as S, flatten)
 
 if TYPE_CHECKING:
+    from textx.metamodel import TextXMetaModel
     from .Theory import Theory
 
 
@@ -76,10 +87,20 @@ class IDP(ASTNode):
         display (Display, Optional): display block, if any
 
         warnings (Exceptions): list of warnings
+
+        cache_file (str, Optional): file of the program in the on-disk cache, if any
+
+        options (dict[str, Any]): the default options of the theories of the program
+            (`'strategy'`, `'budget'`, `'workers'`, `'tables'` and `'type_constraints'`,
+            see `Theory`), e.g., given on the command line,
+            and `'sizes'`, an optional list to which the estimated size
+            of the grounding of each theory is appended
     """
     def __init__(self, **kwargs):
         # log("parsing done")
         self.code = None
+        self.cache_file: Optional[str] = None
+        self.options: dict[str, Any] = {}
         self.vocabularies = self.dedup_nodes(kwargs, 'vocabularies')
         self.theories = self.dedup_nodes(kwargs, 'theories')
         self.structures = self.dedup_nodes(kwargs, 'structures')
@@ -89,8 +110,11 @@ class IDP(ASTNode):
 
         assert len(displays) <= 1, "Too many display blocks"
         self.display = displays[0] if len(displays) == 1 else None
-        self.now_voc = {}
-        self.next_voc = {}
+        if getattr(_block_parsing, 'active', False):
+            return  # the blocks are annotated in the program assembled by BlockCache
+        # vocabularies for the current and next time point, generated on first use
+        self._now_voc: Optional[dict[str, Vocabulary]] = None
+        self._next_voc: Optional[dict[str, Vocabulary]] = None
         init_thrs ={}
         init_strcs ={}
 
@@ -99,18 +123,6 @@ class IDP(ASTNode):
             if t.ltc:
                 t.generate_inertia_def(self)
         for voc in self.vocabularies.values():
-            #Annotating vocabulary for current and next time point; useful for LTC theories
-            #For v_now the time argument of temporal predicates would be dropped e.g p(x,time) becomes p(x)
-            #For v_next in addition to above an other prdicate p_next(x) would be added
-            now_voc:Vocabulary = voc.generate_now_voc()
-            self.now_voc[now_voc.name]=now_voc
-            now_voc.annotate_block(self)
-            #print("voc now")
-            next_voc = voc.generate_next_voc()
-            self.next_voc[next_voc.name]=next_voc
-            next_voc.annotate_block(self)
-            #print("voc next")
-
             voc.annotate_block(self)
             
           
@@ -119,15 +131,8 @@ class IDP(ASTNode):
         for t in self.theories.values():
             if t.ltc:
                 #t.generate_inertia_def(self)
-                #Adds initialized version of LTC theory: For more info check progression document of IDP.
-                t.initialize_theory()
-                #print("theories init")
-                #Adds bistate theory
-                t.bst_theory()
-                #print("theories bis")
-                #Adds transition theory which is used for invariants: For more info check the paper Simulating dynamic systems with LTC 
-                t.trs_theory()
-                #print("theories trs")
+                #Keeps a copy of the LTC theory before annotation;
+                #the initialized, bistate and transition theories are derived from it on first use
                 t.original_theory()
         self.warnings = flatten(t.annotate_block(self)
                                 for t in self.theories.values())
@@ -146,32 +151,69 @@ class IDP(ASTNode):
         if self.display is None:
             self.display = Display(constraints=[], interpretations=[])
     @classmethod
-    def from_file(cls, file:str) -> "IDP":
+    def from_file(cls, file:str, cache_dir: Optional[str] = None) -> "IDP":
         """parse an IDP program from file
 
         Args:
             file (str): path to the source file
 
+            cache_dir (str, optional): see `from_str`
+
         Returns:
             IDP: the result of parsing the IDP program
         """
         assert path.exists(file), f"Can't find {file}"
         with open(file, "r") as source:
             code = source.read()
-            return cls.from_str(code)
+        _source.dir = path.dirname(path.abspath(file))
+        try:
+            return cls.from_str(code, cache_dir=cache_dir)
+        finally:
+            _source.dir = None
 
     @classmethod
-    def from_str(cls, code:str) -> "IDP":
+    def from_str(cls, code:str, cache_dir: Optional[str] = None,
+                 blocks: Optional[BlockCache] = None) -> "IDP":
         """parse an IDP program
 
+        When a `cache_dir` is given, the parsed and annotated program is
+        stored in that directory, and reloaded from it when the same code is
+        parsed again by the same sources of IDP-Z3.
+        The theories grounded from its blocks are stored next to it (see `Theory`).
+        The cache is unpickled, which can execute arbitrary code:
+        the directory must only be writable by trusted users.
+        Its files are not loaded if they, or the directory, are writable by the group or others,
+        or owned by another user.
+
+        When a `blocks` cache is given, only the blocks of the program that
+        were not parsed before are parsed (see `BlockCache`).
+
         Args:
             code (str): source code to be parsed
 
+            cache_dir (str, optional): directory of the on-disk cache.
+                Defaults to None (no caching).
+
+            blocks (BlockCache, optional): cache of parsed blocks, shared
+                by successive calls.  Defaults to None (no caching).
+
         Returns:
             IDP: the result of parsing the IDP program
         """
-        out = idpparser.model_from_str(code)
+        if cache_dir:
+            cache_file = path.join(cache_dir, _cache_key(code) + ".idp.pickle")
+            out = _load_cached(cache_file, code)
+            if out is not None:
+                out.cache_file = cache_file
+                return out
+        if blocks is not None:
+            out = blocks.parse(code)
+        else:
+            out = get_idpparser().model_from_str(code)
         out.code = code
+        if cache_dir:
+            out.cache_file = cache_file
+            _save_cached(cache_file, out)
         return out
 
     @classmethod
@@ -189,10 +231,45 @@ class IDP(ASTNode):
         if path.exists(file_or_string):
             with open(file_or_string, "r") as source:
                 code = source.read()
-        out = idpparser.model_from_str(code)
+        out = get_idpparser().model_from_str(code)
         out.code = code
         return out
 
+    @property
+    def now_voc(self) -> dict[str, Vocabulary]:
+        """the vocabularies for the current time point, by name.
+
+        They are used for LTC theories, and generated on first use:
+        the time argument of temporal predicates is dropped,
+        e.g. p(x,time) becomes p(x).
+        """
+        if self._now_voc is None:
+            now_vocs = {}
+            for voc in self.vocabularies.values():
+                now_voc = voc.generate_now_voc()
+                now_vocs[now_voc.name] = now_voc
+                now_voc.annotate_block(self)
+            self._now_voc = now_vocs
+            _annotate_shared_nodes(self)
+        return self._now_voc
+
+    @property
+    def next_voc(self) -> dict[str, Vocabulary]:
+        """the vocabularies for the current and next time point, by name.
+
+        Like `now_voc`, but with an additional p_next(x) predicate
+        for every temporal predicate p.
+        """
+        if self._next_voc is None:
+            next_vocs = {}
+            for voc in self.vocabularies.values():
+                next_voc = voc.generate_next_voc()
+                next_vocs[next_voc.name] = next_voc
+                next_voc.annotate_block(self)
+            self._next_voc = next_vocs
+            _annotate_shared_nodes(self)
+        return self._next_voc
+
     def get_blocks(self, blocks: List[str] | str) -> List[ASTNode]:
         """returns the AST nodes for the blocks whose names are given
 
@@ -219,6 +296,345 @@ class IDP(ASTNode):
         raise IDPZ3Error("Internal error") # monkey-patched
 
 
+def _stale_data(blocks: List[ASTNode]) -> bool:
+    """True if the blocks have a file enumeration whose file was modified"""
+    return any(isinstance(i.enumeration, FileEnumeration)
+               and i.enumeration.is_stale()
+               for block in blocks if hasattr(block, 'interpretations')
+               for i in block.interpretations.values())
+
+
+def _annotate_shared_nodes(idp: IDP) -> None:
+    """annotates the shared nodes of Expression.py with the last vocabulary
+    of the program, as `IDP.__init__` does"""
+    voc = list(idp.vocabularies.values())[-1]
+    for set_name in [BOOL_SETNAME, INT_SETNAME, REAL_SETNAME, DATE_SETNAME]:
+        set_name.annotate(voc, {})
+    for constructor in [TRUEC, FALSEC]:
+        constructor.codomain = voc.symbol_decls[BOOL].domains[0]
+
+
+################################ Cache  ##############################
+
+# the shared nodes of Expression.py, which must keep their identity
+_SHARED_NODES = {'BOOL_SETNAME': BOOL_SETNAME, 'INT_SETNAME': INT_SETNAME,
+                 'REAL_SETNAME': REAL_SETNAME, 'DATE_SETNAME': DATE_SETNAME,
+                 'EMPTY_SETNAME': EMPTY_SETNAME, 'TRUEC': TRUEC,
+                 'FALSEC': FALSEC, 'TRUE': TRUE, 'FALSE': FALSE,
+                 'ZERO': ZERO, 'ONE': ONE}
+
+# the depth of ASTs exceeds the default recursion limit of pickle
+_PICKLE_RECURSION_LIMIT = 20000
+
+
+# hash of the sources of the engine, computed on first use
+_engine_hash: Optional[str] = None
+
+
+def _cache_key(code: str) -> str:
+    """hash of the code, of its folder, of the sources of the engine, and of the version of Python"""
+    global _engine_hash
+    if _engine_hash is None:
+        engine = sha256()
+        folder = path.dirname(__file__)
+        for name in sorted(glob.glob(path.join(folder, "*.py"))) + [path.join(folder, "Idp.tx")]:
+            with open(name, "rb") as f:
+                engine.update(f.read())
+        _engine_hash = engine.hexdigest()
+    version = f"{_engine_hash} {sys.version_info[0]}.{sys.version_info[1]}\n"
+    folder = f"{getattr(_source, 'dir', None)}\n"  # for file enumerations
+    return sha256((version + folder + code).encode('utf-8')).hexdigest()
+
+
+class _SourceLocator:
+    """Replaces the textX parser in a cached IDP program.
+
+    It only converts positions in the source code to line and column,
+    for error messages (see `ASTNode.location`).
+    """
+    def __init__(self, code: str):
+        self.input = code
+        self.line_ends: List[int] = []
+
+    def pos_to_linecol(self, pos: int) -> Tuple[int, int]:
+        from arpeggio import Parser  # deferred, as textX takes long to import
+        return Parser.pos_to_linecol(self, pos)
+
+
+class _IDPPickler(pickle.Pickler):
+    """Pickles an IDP program by reference to the textX metamodel,
+    to its textX classes, and to the shared nodes of Expression.py.
+    Z3 objects are not pickled: they are translated again when needed."""
+
+    def __init__(self, file):
+        from arpeggio import Parser  # deferred, as textX takes long to import
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared = {id(node): name for name, node in _SHARED_NODES.items()}
+        self.parser_class = Parser
+
+    def persistent_id(self, obj):
+        if obj is _idpparser:
+            return ("metamodel",)
+        if isinstance(obj, self.parser_class):
+            return ("parser",)
+        if isinstance(obj, type) and obj.__module__ == 'textx.metamodel':
+            return ("class", obj.__name__)
+        if isinstance(obj, (AstRef, Context)):
+            return ("z3",)
+        name = self.shared.get(id(obj), None)
+        return None if name is None else ("shared", name)
+
+
+class _IDPUnpickler(pickle.Unpickler):
+    def __init__(self, file, code: str):
+        super().__init__(file)
+        self.locator = _SourceLocator(code)
+
+    def persistent_load(self, pid):
+        kind = pid[0]
+        if kind == "metamodel":
+            return get_idpparser()
+        if kind == "parser":
+            return self.locator
+        if kind == "class":
+            return get_idpparser()[pid[1]]
+        if kind == "shared":
+            return _SHARED_NODES[pid[1]]
+        if kind == "z3":
+            return None
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid}")
+
+
+def _save_cached(cache_file: str, data: Any,
+                 pickler: Callable[[IO[bytes]], pickle.Pickler] = _IDPPickler) -> None:
+    """stores the annotated program (or other data) in the cache; failures are ignored"""
+    limit = sys.getrecursionlimit()
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(path.dirname(cache_file), exist_ok=True)
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        with open(tmp_file, "wb") as f:
+            pickler(f).dump(data)
+        os.replace(tmp_file, cache_file)  # atomic
+    except (OSError, RecursionError, pickle.PicklingError,
+            TypeError, AttributeError):
+        if path.exists(tmp_file):
+            os.remove(tmp_file)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def _trusted(cache_file: str) -> bool:
+    """True if the cache file and its directory are owned by the current user (or root),
+    and can't be modified by others.
+
+    The cache is unpickled, which can execute arbitrary code:
+    the files of other users are not loaded.
+    """
+    if not hasattr(os, 'getuid'):  # e.g., on Windows
+        return True
+    for name in (path.dirname(cache_file) or os.curdir, cache_file):
+        info = os.stat(name)
+        if (info.st_uid not in (os.getuid(), 0)
+            or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+            return False
+    return True
+
+
+def _load_cached(cache_file: str, code: str) -> Optional[IDP]:
+    """returns the cached program, or None if it is not in the (trusted) cache"""
+    if not path.exists(cache_file):
+        return None
+    limit = sys.getrecursionlimit()
+    try:
+        if not _trusted(cache_file):
+            return None
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        with open(cache_file, "rb") as f:
+            idp = _IDPUnpickler(f, code).load()
+        if not isinstance(idp, IDP) or idp.code != code:
+            return None
+        if _stale_data(list(idp.structures.values()) + list(idp.theories.values())):
+            return None
+        _annotate_shared_nodes(idp)
+        return idp
+    except (OSError, EOFError, RecursionError, pickle.UnpicklingError,
+            AttributeError, ImportError, IndexError, KeyError,
+            TypeError, ValueError):  # corrupted or stale cache entry
+        return None
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+################################ Incremental parsing  ####################
+
+# set while BlockCache parses a chunk of a program, to defer its annotation
+_block_parsing = threading.local()
+
+# the directory of the source file being parsed by `IDP.from_file`, if any:
+# the files of file enumerations are relative to it
+_source = threading.local()
+
+# the keywords starting a block, at the beginning of a line
+_BLOCK_START = re.compile(
+    r"^(vocabulary|theory|structure|temporal_logic|procedure|display)\b",
+    re.MULTILINE)
+
+# the arguments of IDP.__init__ with named blocks (displays are not named)
+_BLOCK_KINDS = ('vocabularies', 'theories', 'structures',
+                'temporallogicformulas', 'procedures')
+
+
+class BlockCache:
+    """Parses IDP programs block by block, reusing the blocks parsed for
+    previous programs.
+
+    The source code is split in chunks before each line that starts with
+    the keyword of a block (e.g. `theory`).  Each chunk is parsed separately,
+    and kept in pickled form, by hash of its text.  A chunk that is unchanged
+    since a previous program is thus unpickled instead of parsed.  The
+    positions of its nodes remain relative to the chunk (see `_ChunkLocator`).
+
+    The blocks are then annotated in the new program, as by `IDP.from_str`:
+    annotation depends on the other blocks, and it takes little time
+    compared to parsing.
+
+    Args:
+        max_size (int): maximum number of chunks kept in the cache.
+    """
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self.chunks: OrderedDict[str, bytes] = OrderedDict()  # {hash: pickled blocks}
+        self.lock = threading.Lock()
+
+    def parse(self, code: str) -> IDP:
+        """parse an IDP program, reusing the chunks already parsed
+
+        A full parse is done when a chunk cannot be parsed on its own,
+        e.g., because of a syntax error, so that errors are reported as usual.
+
+        Args:
+            code (str): source code to be parsed
+
+        Returns:
+            IDP: the result of parsing the IDP program
+        """
+        source = _SourceLocator(code)
+        starts = [0] + [m.start() for m in _BLOCK_START.finditer(code)
+                        if m.start() != 0]
+        kwargs: dict[str, List[ASTNode]] = {kind: [] for kind in _BLOCK_KINDS}
+        kwargs['displays'] = []
+        try:
+            for start, end in zip(starts, starts[1:] + [len(code)]):
+                locator = _ChunkLocator(source, start)
+                for kind, block in self.chunk(code[start:end]):
+                    block.parent = locator
+                    kwargs[kind].append(block)
+        except Exception:
+            kwargs = {}
+        if not kwargs:
+            return get_idpparser().model_from_str(code)
+
+        # assemble the program, as textX would
+        out = IDP.__new__(IDP)
+        out._tx_parser = source
+        out._tx_filename = None
+        out._tx_metamodel = get_idpparser()
+        out.__init__(**kwargs)
+        return out
+
+    def chunk(self, text: str) -> List[Tuple[str, ASTNode]]:
+        """returns the fresh, un-annotated blocks of a chunk of code
+
+        Args:
+            text (str): the code of the chunk
+
+        Returns:
+            List[Tuple[str, ASTNode]]: the blocks, with their kind
+        """
+        key = sha256(text.encode('utf-8')).hexdigest()
+        with self.lock:
+            data = self.chunks.get(key, None)
+            if data is not None:
+                self.chunks.move_to_end(key)
+        if data is not None:
+            blocks = _loads_blocks(data)
+            if _stale_data([block for _, block in blocks]):
+                data = None
+        if data is not None:
+            for kind, block in blocks:  # a definition must have a unique id
+                if kind == 'theories':
+                    for definition in block.definitions:
+                        Definition.definition_id += 1
+                        definition.id = Definition.definition_id
+        else:
+            blocks = _parse_chunk(text)
+            data = _dumps_blocks(blocks)
+            if data is not None:
+                with self.lock:
+                    self.chunks[key] = data
+                    if self.max_size < len(self.chunks):
+                        self.chunks.popitem(last=False)  # the oldest entry
+        return blocks
+
+
+def _parse_chunk(text: str) -> List[Tuple[str, ASTNode]]:
+    """parse a chunk of code, without annotating its blocks"""
+    _block_parsing.active = True
+    try:
+        model = get_idpparser().model_from_str(text)
+    finally:
+        _block_parsing.active = False
+    out = [(kind, block) for kind in _BLOCK_KINDS
+           for block in getattr(model, kind).values()]
+    if model.display:
+        out.append(('displays', model.display))
+    for _, block in out:
+        block.parent = None  # not pickled
+    return out
+
+
+def _dumps_blocks(blocks: List[Tuple[str, ASTNode]]) -> Optional[bytes]:
+    """pickles un-annotated blocks; returns None on failure"""
+    limit = sys.getrecursionlimit()
+    try:
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        buffer = io.BytesIO()
+        _IDPPickler(buffer).dump(blocks)
+        return buffer.getvalue()
+    except (RecursionError, pickle.PicklingError, TypeError, AttributeError):
+        return None
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def _loads_blocks(data: bytes) -> List[Tuple[str, ASTNode]]:
+    limit = sys.getrecursionlimit()
+    try:
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        return _IDPUnpickler(io.BytesIO(data), "").load()
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+class _ChunkLocator:
+    """Parent of the blocks of a chunk parsed by BlockCache.
+
+    The positions of their nodes are relative to the chunk:
+    it converts them to line and column in the program, for error messages
+    (see `ASTNode.location`).
+    """
+    _tx_filename = None
+
+    def __init__(self, source: _SourceLocator, offset: int):
+        self._tx_parser = self
+        self.source = source
+        self.offset = offset
+
+    def pos_to_linecol(self, pos: int) -> Tuple[int, int]:
+        return self.source.pos_to_linecol(pos + self.offset)
+
+
 ################################ Vocabulary  ##############################
 
 
@@ -394,7 +810,7 @@ class Vocabulary(ASTNode):
         return nowvoc
 
     #Used for generating the vocabulary of current time, used in the context of LTC theories
-    #Has to be called before self is annotated
+    #Has to be called after self is annotated: the time argument added by the annotation is dropped
     #TO DO: Merge common parts of now and next voc methods            
     def generate_now_voc(self):
         nowvoc = Vocabulary(parent=None,name=self.name+'_now',tempdcl=[],declarations=[])
@@ -405,20 +821,21 @@ class Vocabulary(ASTNode):
                     #The predicate is temporal
                     if d.name == t.symbol.name:
                         changed = True
-                        sr = [s.init_copy() for s in d.domains]
-                        id = SymbolDeclaration(parent=None,name=(d.name),sorts=sr,out=d.codomain,annotations=Annotations(None,[]))
+                        sr = Vocabulary.untimed_domains(d)
+                        id = SymbolDeclaration(parent=None,name=(d.name),sorts=sr,out=d.codomain.init_copy(),annotations=Annotations(None,[]))
                         nowvoc.declarations.append(id)
                         break
             if not changed:
                 if isinstance(d,VarDeclaration):
-                    nowvoc.declarations.append(VarDeclaration(parent=None,name=(d.name),subtype=d.subtype))
+                    nowvoc.declarations.append(VarDeclaration(parent=None,name=(d.name),subtype=d.subtype.init_copy()))
                 elif isinstance(d,SymbolDeclaration):
-                    nowvoc.declarations.append(SymbolDeclaration(parent=None,name=(d.name),sorts=d.domains,out=d.codomain,annotations=Annotations(None,[])))
+                    sr = [s.init_copy() for s in d.domains]
+                    nowvoc.declarations.append(SymbolDeclaration(parent=None,name=(d.name),sorts=sr,out=d.codomain.init_copy(),annotations=Annotations(None,[])))
                 elif isinstance(d,TypeDeclaration):
                     enum =None
-                    if d.interpretation:
-                        enum = d.interpretation.enumeration.init_copy()
-                    cnstr = [c.init_copy() for c in d.constructors]
+                    if d.declared_interpretation:
+                        enum = d.declared_interpretation.enumeration.init_copy()
+                    cnstr = [c.init_copy() for c in d.declared_constructors]
                     if len(cnstr) ==0:
                         nowvoc.declarations.append(TypeDeclaration(parent=None,name=d.name,enumeration=enum))
                     else:
@@ -442,13 +859,13 @@ class Vocabulary(ASTNode):
                 if isinstance(d,SymbolDeclaration):
                     if str(d.name) == str(t.symbol):
                         changed = True
-                        sr = [s.init_copy() for s in d.domains]
+                        sr = Vocabulary.untimed_domains(d)
                         #Current time predicate
-                        id = SymbolDeclaration(parent=None,name=d.name,sorts=sr,out=d.codomain,annotations=Annotations(None,[]))
+                        id = SymbolDeclaration(parent=None,name=d.name,sorts=sr,out=d.codomain.init_copy(),annotations=Annotations(None,[]))
                         nowvoc.declarations.append(id)
-                        srn = [s.init_copy() for s in d.domains]
+                        srn = Vocabulary.untimed_domains(d)
                         #Next time predicate
-                        next_d = SymbolDeclaration(parent=None,name=(d.name),sorts=srn,out=d.codomain,annotations=Annotations(None,[]))
+                        next_d = SymbolDeclaration(parent=None,name=(d.name),sorts=srn,out=d.codomain.init_copy(),annotations=Annotations(None,[]))
                         next_d.name = d.name + "_next"
                         next_d.is_next= True
                         nowvoc.declarations.append(next_d)
@@ -456,14 +873,15 @@ class Vocabulary(ASTNode):
                         break
             if not changed:
                 if isinstance(d,VarDeclaration):
-                    nowvoc.declarations.append(VarDeclaration(parent=None,name=(d.name),subtype=d.subtype))
+                    nowvoc.declarations.append(VarDeclaration(parent=None,name=(d.name),subtype=d.subtype.init_copy()))
                 elif isinstance(d,SymbolDeclaration):
-                    nowvoc.declarations.append(SymbolDeclaration(parent=None,name=(d.name),sorts=d.domains,out=d.codomain,annotations=Annotations(None,[])))
+                    sr = [s.init_copy() for s in d.domains]
+                    nowvoc.declarations.append(SymbolDeclaration(parent=None,name=(d.name),sorts=sr,out=d.codomain.init_copy(),annotations=Annotations(None,[])))
                 elif isinstance(d,TypeDeclaration):
                     enum =None
-                    if d.interpretation:
-                        enum = d.interpretation.enumeration.init_copy()
-                    cnstr = [c.init_copy() for c in d.constructors]
+                    if d.declared_interpretation:
+                        enum = d.declared_interpretation.enumeration.init_copy()
+                    cnstr = [c.init_copy() for c in d.declared_constructors]
                     if len(cnstr) ==0:
                         nowvoc.declarations.append(TypeDeclaration(parent=None,name=d.name,enumeration=enum))
                     else:
@@ -474,6 +892,14 @@ class Vocabulary(ASTNode):
                     nowvoc.declarations.append(d.init_copy())
         return nowvoc
 
+    #Copies the domains of a declaration, without the time argument of temporal predicates
+    @staticmethod
+    def untimed_domains(d:SymbolDeclaration) -> List[SetName]:
+        sr = [s.init_copy() for s in d.domains]
+        if d.temp:
+            sr.pop()
+        return sr
+
 class Import(ASTNode):
     def __init__(self, **kwargs):
         self.name = kwargs.pop('name')
@@ -500,6 +926,9 @@ class TypeDeclaration(ASTNode):
 
         map (dict[string, Expression]): a mapping from code to Expression in range
 
+        indexed (Tuple[List, set[str], set[float]]): the codes of the values in the extension
+            of the type, and the numeric values of its numbers and dates
+
         block (Vocabulary): the vocabulary block that contains it
     """
 
@@ -517,6 +946,9 @@ class TypeDeclaration(ASTNode):
         self.block: Optional[Block] = None
 
         self.map : dict[str, Expression]= {}
+        # the superset last seen by contains_element, the codes of its values,
+        # and the numeric values of its numbers and dates
+        self.indexed : Tuple[Optional[List], set[str], set[float]] = (None, set(), set())
 
         self.interpretation : Optional[SymbolInterpretation] = None
         if enumeration:
@@ -525,6 +957,9 @@ class TypeDeclaration(ASTNode):
                                  sign='≜',
                                  enumeration=enumeration, default=FALSE)
             self.interpretation.block = parent
+        #As declared in the vocabulary, before a Theory interprets the type: used to derive the LTC vocabularies
+        self.declared_constructors = self.constructors
+        self.declared_interpretation = self.interpretation
 
     def init_copy(self,parent=None):
         enum =None
@@ -563,7 +998,13 @@ class TypeDeclaration(ASTNode):
             if superset is not None:
                 # superset.sort(key=lambda t: str(t))
                 if term.is_value():
-                    comparisons = (TRUE if any(term.same_as(t[0]) for t in superset) else
+                    if self.indexed[0] is not superset:
+                        self.indexed = (superset, {t[0].str for t in superset},
+                                        {float(t[0].py_value) for t in superset
+                                         if type(t[0]) in [Number, Date]})
+                    comparisons = (TRUE if term.str in self.indexed[1]
+                                        or (type(term) in [Number, Date]
+                                            and float(term.py_value) in self.indexed[2]) else
                                    FALSE)
                 else:
                     comparisons = OR([EQUALS([term, t[0]]) for t in superset])
@@ -803,13 +1244,50 @@ class TheoryBlock(ASTNode):
                 rule.block = self
         self.voc = None
         # For storing the initialized, bistate and transition theory for ltc theories
-        self.init_theory : TheoryBlock = None
-        self.bistate_theory : TheoryBlock = None
-        self.transition_theory : TheoryBlock = None
+        # They are derived from org_theory on first use
+        self._init_theory : Optional[TheoryBlock] = None
+        self._bistate_theory : Optional[TheoryBlock] = None
+        self._transition_theory : Optional[TheoryBlock] = None
         self.org_theory : TheoryBlock = None
 
     def __str__(self):
         return self.name
+
+    #Initialized version of LTC theory: For more info check progression document of IDP.
+    @property
+    def init_theory(self) -> Optional[TheoryBlock]:
+        if self._init_theory is None and self.ltc and self.org_theory:
+            self.initialize_theory()
+            if not self.inv:
+                self.annotate_init_theory(self.idp)
+        return self._init_theory
+
+    #Bistate theory
+    @property
+    def bistate_theory(self) -> Optional[TheoryBlock]:
+        if self._bistate_theory is None and self.ltc and self.org_theory:
+            self.bst_theory()
+            if not self.inv:
+                self.annotate_bis_theory(self.idp)
+        return self._bistate_theory
+
+    #Transition theory which is used for invariants: For more info check the paper Simulating dynamic systems with LTC
+    @property
+    def transition_theory(self) -> Optional[TheoryBlock]:
+        if self._transition_theory is None and self.ltc and self.org_theory:
+            self.trs_theory()
+            if not self.inv:
+                self.annotate_trs_theory(self.idp)
+        return self._transition_theory
+
+    def annotate_init_theory(self, idp: IDP) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
+    def annotate_bis_theory(self, idp: IDP) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
+    def annotate_trs_theory(self, idp: IDP) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
     
     def generate_inertia_def(self,idp:IDP):
         voc :Vocabulary= idp.vocabularies[self.vocab_name]
@@ -987,12 +1465,12 @@ class TheoryBlock(ASTNode):
                 return True
         return False
     
-    #Initializes the transition thoery; used for LTC theories
+    #Derives the transition thoery from org_theory; used for LTC theories
     def trs_theory(self):
-        self.transition_theory = TheoryBlock(name=self.name+'_transition',vocab_name=self.vocab_name+'_next',ltc = None,inv=None,
+        self._transition_theory = TheoryBlock(name=self.name+'_transition',vocab_name=self.vocab_name+'_next',ltc = None,inv=None,
                                                      constraints=[],definitions=[],interpretations=[])
         cnstrs = []
-        for c in self.constraints:
+        for c in self.org_theory.constraints:
             n = self.contains_next(c) 
             if n:
                 r = self.bis_subexpr(c.init_copy())
@@ -1011,7 +1489,7 @@ class TheoryBlock(ASTNode):
                     r.str = r.code
                     r2.str = r2.code
         defs = []
-        for definition in self.definitions:
+        for definition in self.org_theory.definitions:
             defs.append(Definition(None,Annotations(None,[]),definition.mode_str,[]))
             for rule in definition.rules:
                 rl = rule.init_copy()
@@ -1074,16 +1552,16 @@ class TheoryBlock(ASTNode):
         for d in defs:
             for r in d.rules:
                 r.block = self.transition_theory
-        for i in self.interpretations.values():
+        for i in self.org_theory.interpretations.values():
             r = i.initialize_temporal_interpretation([])
             self.transition_theory.interpretations[r.name] = r
         
-    #Initializes the bistate thoery; used for LTC theories
+    #Derives the bistate thoery from org_theory; used for LTC theories
     def bst_theory(self):
-        self.bistate_theory = TheoryBlock(name=self.name+'_next',vocab_name=self.vocab_name+'_next',ltc = None,inv=None,
+        self._bistate_theory = TheoryBlock(name=self.name+'_next',vocab_name=self.vocab_name+'_next',ltc = None,inv=None,
                                                      constraints=[],definitions=[],interpretations=[])
         cnstrs = []
-        for c in self.constraints:
+        for c in self.org_theory.constraints:
             n = self.contains_next(c)
             if n:
                 r = self.bis_subexpr(c.init_copy())
@@ -1098,7 +1576,7 @@ class TheoryBlock(ASTNode):
                     r.code = intern(str(r))
                     r.str = r.code
         defs = []
-        for definition in self.definitions:
+        for definition in self.org_theory.definitions:
             defs.append(Definition(None,Annotations(None,[]),definition.mode_str,[]))
             for rule in definition.rules:
                 defs[-1].rules.append(self.bis_rule(rule.init_copy()))
@@ -1113,18 +1591,18 @@ class TheoryBlock(ASTNode):
                 r.block = self.bistate_theory
         
             
-    #Initializes the initial thoery; used for LTC theories
+    #Derives the initial thoery from org_theory; used for LTC theories
     def initialize_theory(self):
-        self.init_theory = TheoryBlock(name=self.name+'_now',vocab_name=self.vocab_name+'_now',ltc = None,inv=None,
+        self._init_theory = TheoryBlock(name=self.name+'_now',vocab_name=self.vocab_name+'_now',ltc = None,inv=None,
                                                      constraints=[],definitions=[],interpretations=[])
         cnstrs = []
-        for c in self.constraints:
+        for c in self.org_theory.constraints:
             r = self.init_subexpr(c.init_copy())
             if r != False:
                 r.code = intern(str(r))
                 r.str = r.code
                 self.init_theory.constraints.append(r)
-        for definition in self.definitions:
+        for definition in self.org_theory.definitions:
             self.init_theory.definitions.append(Definition(None,Annotations(None,[]),definition.mode_str,[]))
             nextl = []
             nextlquantees = []
@@ -1428,6 +1906,12 @@ class Definition(Expression):
     def instantiate_definition(self, decl, new_args, theory):
         raise IDPZ3Error("Internal error") # monkey-patched
 
+    def materialize(self, problem) -> bool:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
+    def grounding_size(self, problem) -> int:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
 
 class Rule(Expression):
     def __init__(self, parent,
@@ -1464,7 +1948,8 @@ class Rule(Expression):
         cls = self.__class__ # Extract the class of the object
         out = cls.__new__(cls) # Create a new instance of the object based on extracted class
         memo[id(self)] = out
-        out.__dict__.update(self.__dict__)
+        for name, value in self._attributes():
+            setattr(out, name, value)
 
         out.definiendum = deepcopy(self.definiendum)
         out.definiendum.sub_exprs = [deepcopy(e) for e in self.definiendum.sub_exprs]
@@ -1530,15 +2015,51 @@ class Structure(ASTNode):
         self.voc = None
         self.declarations = {}
         self.assignments = Assignments()
-        #Initial structure: Used in the context of LTC theories
-        self.init_struct : Structure= None
-        self.static_now : Structure = None
-        self.static_next : Structure = None
-        self.static_expanded : Structure = None
+        #Copy of the interpretations of the block, before annotation: used to derive the LTC structures
+        self.source_interpretations : List[SymbolInterpretation] = []
+        #Structures used in the context of LTC theories, derived on first use
+        self._init_struct : Optional[Structure] = None
+        self._static_now : Optional[Structure] = None
+        self._static_next : Optional[Structure] = None
+        self._static_expanded : Optional[Structure] = None
 
     def __str__(self):
         return self.name
 
+    #Initial structure: Used in the context of LTC theories
+    @property
+    def init_struct(self) -> Structure:
+        if self._init_struct is None:
+            self.annotate_init_structure(self.voc.idp)
+        return self._init_struct
+
+    @property
+    def static_now(self) -> Structure:
+        if self._static_now is None:
+            self.annotate_static_structure(self.voc.idp, "_now")
+        return self._static_now
+
+    @property
+    def static_next(self) -> Structure:
+        if self._static_next is None:
+            self.annotate_static_structure(self.voc.idp, "_next")
+        return self._static_next
+
+    @property
+    def static_expanded(self) -> Structure:
+        if self._static_expanded is None:
+            self.expanded_static_struct(self.voc.idp)
+        return self._static_expanded
+
+    def annotate_init_structure(self, idp: IDP) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
+    def annotate_static_structure(self, idp: IDP, suffix: str) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
+    def expanded_static_struct(self, idp: IDP) -> None:
+        raise IDPZ3Error("Internal error") # monkey-patched
+
 
 class SymbolInterpretation(Expression):
     """
@@ -1693,7 +2214,7 @@ class SymbolInterpretation(Expression):
                                 changed =True
                 #TO DO : ADD ELSE CASE
                 if not isinstance(enum,ConstructedFrom):
-                    if isinstance(enum,Ranges):
+                    if isinstance(enum,(Ranges,FileEnumeration)):
                         #TO DO how is it possible to return Range type
                         enum = Enumeration(None,tuples=tp)
                     else:
@@ -1724,6 +2245,9 @@ class Enumeration(Expression):
 
         lookup: dictionary from arguments to values
 
+        trie (Tuple[List[TupleIDP], dict[int, Trie]]): the sorted tuples, and their index
+            by arguments for each arity, computed when first needed (see `contains`)
+
         constructors (List[Constructor], optional): List of Constructor
     """
     def __init__(self, parent:ASTNode|None, tuples: List[TupleIDP]):
@@ -1731,6 +2255,7 @@ class Enumeration(Expression):
         self.tuples: Optional[OrderedSet] = OrderedSet(tuples)
 
         self.lookup: dict[str, Expression] = {}
+        self.trie: Tuple[Optional[List[TupleIDP]], dict[int, Trie]] = (None, {})
         self.constructors: Optional[List[Constructor]]
         if all(len(c.args) == 1 and type(c.args[0]) == UnappliedSymbol
                for c in self.tuples):
@@ -1756,37 +2281,23 @@ class Enumeration(Expression):
                  tuples: Optional[List[TupleIDP]] = None,
                  theory: Optional[Theory] = None
                  ) -> Expression:
-        """ returns an Expression that says whether Tuple args is in the enumeration """
+        """ returns an Expression that says whether Tuple args is in the enumeration
+
+        The tuples are indexed in a trie on first use,
+        so that the cost of a call is proportional to the size of its result.
+        """
 
         if arity is None:
             arity = len(args)
         if rank == arity:  # valid tuple
             return TRUE
-        if tuples is None:
-            tuples = self.sorted_tuples
-
-        # constructs If-then-else recursively
-        groups = groupby(tuples, key=lambda t: str(t.args[rank]))
-        if args[rank].is_value():
-            for val, tuples2 in groups:  # try to resolve
-                if str(args[rank]) == val:
-                    return self.contains(args, arity, rank+1, list(tuples2),
-                                theory=theory)
-            return FALSE
-        else:
-            if rank + 1 == arity:  # use OR
-                equalities = [ EQUALS([args[rank], t.args[rank]])
-                        for t in tuples]
-                out = OR(equalities)
-                out.enumerated = ', '.join(str(c) for c in tuples)
-                return out
-            out = FALSE
-            for val, tuples2 in groups:
-                tuples = list(tuples2)
-                out = IF(EQUALS([args[rank], tuples[0].args[rank]]),
-                    self.contains(args, arity, rank+1, tuples, theory),
-                    out)
-            return out
+        if tuples is not None:
+            return _contains(args, arity, rank, _trie(tuples, rank, arity))
+        if self.trie[0] is not self.sorted_tuples:
+            self.trie = (self.sorted_tuples, {})
+        if arity not in self.trie[1]:
+            self.trie[1][arity] = _trie(self.sorted_tuples, 0, arity)
+        return _contains(args, arity, rank, self.trie[1][arity])
 
     def extensionE(self,
                    extensions: Optional[dict[str, Extension]]=None
@@ -1805,6 +2316,49 @@ class Enumeration(Expression):
         return ([[t] for r in ranges for t in r], None)
 
 
+Trie = dict[str, Tuple[Expression, Union["Trie", "TupleIDP"]]]
+
+
+def _trie(tuples: List[TupleIDP], rank: int, arity: int) -> Trie:
+    """returns an index of the tuples by their arguments, from rank to arity.
+
+    Each level maps the string of an argument to a pair (argument, sub-trie),
+    in the order of the tuples; at the last level, the sub-trie is the tuple.
+    """
+    out: Trie = {}
+    for t in tuples:
+        node = out
+        for i in range(rank, arity-1):
+            entry = node.get(str(t.args[i]), None)
+            if entry is None:
+                entry = node[str(t.args[i])] = (t.args[i], {})
+            node = entry[1]
+        node.setdefault(str(t.args[arity-1]), (t.args[arity-1], t))
+    return out
+
+
+def _contains(args: List[Expression], arity: int, rank: int, trie: Trie
+              ) -> Expression:
+    """returns an Expression that says whether args[rank:] is in the trie"""
+    if rank == arity:  # valid tuple
+        return TRUE
+    if args[rank].is_value():  # resolve
+        entry = trie.get(str(args[rank]), None)
+        return (FALSE if entry is None else
+                _contains(args, arity, rank+1, entry[1]))
+    if rank + 1 == arity:  # use OR
+        out = OR([EQUALS([args[rank], value]) for value, _ in trie.values()])
+        out.enumerated = ', '.join(str(t) for _, t in trie.values())
+        return out
+    # constructs If-then-else
+    out = FALSE
+    for value, sub_trie in trie.values():
+        out = IF(EQUALS([args[rank], value]),
+                 _contains(args, arity, rank+1, sub_trie),
+                 out)
+    return out
+
+
 class FunctionEnum(Enumeration):
     def extensionE(self,
                    extensions: Optional[dict[str, Extension]] = None
@@ -1824,6 +2378,79 @@ class CSVEnumeration(Enumeration):
     pass
 
 
+# the separator of the cells in a CSV enumeration, or in a file enumeration
+CSV_SEPARATOR = re.compile(r"[\t ]*,[\t ]*|[\t ]+")
+NUMBER = re.compile(r"-?\d+(\.\d*)?(/\d+)?$")
+
+
+class FileEnumeration(Enumeration):
+    """Represents an enumeration of tuples read from a CSV or TSV file,
+    e.g., ``P := file("p.csv").``
+
+    The file has one tuple per line, with cells separated by commas, tabs or
+    spaces, as in a CSV enumeration.  It is read in bulk, without parsing:
+    equal cells share the same Expression, which is annotated only once.
+
+    Attributes:
+        path (str): absolute path of the file.  A relative path is relative to
+            the folder of the source file of the program, if any,
+            or else to the current directory.
+
+        mtime (int): modification time of the file, when it was read
+    """
+    def __init__(self, parent: Optional[ASTNode], path: str,
+                 tuples: Optional[List[TupleIDP]] = None):
+        self.path = os.path.abspath(
+            os.path.join(getattr(_source, 'dir', None) or os.getcwd(), path))
+        if tuples is None:
+            try:
+                self.mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path, "r") as f:
+                    tuples = self.read(f)
+            except OSError as e:
+                raise IDPZ3Error(f"Can't read {path}: {e.strerror}")
+        else:
+            self.mtime = 0
+        super().__init__(parent, tuples)
+
+    @staticmethod
+    def read(lines) -> List[TupleIDP]:
+        """returns the tuples in lines of CSV or TSV data"""
+        values: dict[str, Expression] = {}  # {cell: value}
+        out = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            args = []
+            for cell in CSV_SEPARATOR.split(line):
+                value = values.get(cell, None)
+                if value is None:
+                    value = (Number(number=cell) if NUMBER.match(cell) else
+                             Date(iso=cell) if cell.startswith('#') else
+                             UnappliedSymbol(None, cell))
+                    values[cell] = value
+                args.append(value)
+            out.append(TupleIDP(args=args))
+        return out
+
+    def is_stale(self) -> bool:
+        """True if the file was modified since it was read"""
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except OSError:
+            return True
+
+    def init_copy(self, parent=None):
+        values = {id(a): a for t in self.tuples for a in t.args}
+        values = {k: v.init_copy() for k, v in values.items()}
+        tp = [TupleIDP(args=[values[id(a)] for a in t.args])
+              for t in self.tuples]
+        out = FileEnumeration(parent, self.path, tp)
+        out.mtime = self.mtime
+        return out
+
+
 class ConstructedFrom(Enumeration):
     """Represents a 'constructed from' enumeration of constructors
 
@@ -2442,32 +3069,49 @@ Block = Union[Vocabulary, TheoryBlock, Structure, Display]
 
 dslFile = path.join(path.dirname(__file__), 'Idp.tx')
 
-idpparser = metamodel_from_file(dslFile, memoization=True,
-                                classes=[IDP, Annotations,
-
-                                         Vocabulary, Import, VarDeclaration,
-                                         TypeDeclaration, Accessor, SetName,
-                                         SymbolDeclaration,TemporalDeclaration,
-                                         SymbolExpr,
-
-                                         TheoryBlock, Definition, Rule, AIfExpr,ForNext,
-                                         AQuantification, Quantee, ARImplication,
-                                         AEquivalence, AImplication,
-                                         ADisjunction, AConjunction,
-                                         AComparison, ASumMinus, AMultDiv,
-                                         APower, AUnary, AAggregate,
-                                         AppliedSymbol, UnappliedSymbol,StartAppliedSymbol,NowAppliedSymbol,NextAppliedSymbol,
-                                         CauseFalseAppliedSymbol,CauseTrueAppliedSymbol,
-                                         Number, Brackets, Date, Variable,
-                                         TempLogic,ILFormula,DLFormula,
-                                         CLFormula,NLFormula,XLFormula,FLFormula,GLFormula,ULFormula,WLFormula,RLFormula,
-                                         NCFormula , CCFormula , DCFormula , ICFormula , AXFormula , EXFormula  , AFFormula,
-                                         EFFormula , AGFormula , EGFormula , AUFormula , EUFormula,
-                                         Structure, SymbolInterpretation,
-                                         Enumeration, FunctionEnum, CSVEnumeration,
-                                         TupleIDP, FunctionTuple, CSVTuple,
-                                         ConstructedFrom, Constructor, Ranges,
-                                         RangeElement, Display,
-
-                                         Procedure, Call1, String,
-                                         PyList, PyAssignment])
+# the textX metamodel of IDP-Z3, built on first use: building it takes
+# about as long as importing all the other modules of the engine.
+_idpparser: Optional[TextXMetaModel] = None
+
+
+def get_idpparser() -> TextXMetaModel:
+    """returns the textX metamodel of IDP-Z3, built on first use"""
+    global _idpparser
+    if _idpparser is None:
+        from textx import metamodel_from_file
+        _idpparser = metamodel_from_file(dslFile, memoization=True,
+                                         classes=[IDP, Annotations,
+
+                                                  Vocabulary, Import, VarDeclaration,
+                                                  TypeDeclaration, Accessor, SetName,
+                                                  SymbolDeclaration,TemporalDeclaration,
+                                                  SymbolExpr,
+
+                                                  TheoryBlock, Definition, Rule, AIfExpr,ForNext,
+                                                  AQuantification, Quantee, ARImplication,
+                                                  AEquivalence, AImplication,
+                                                  ADisjunction, AConjunction,
+                                                  AComparison, ASumMinus, AMultDiv,
+                                                  APower, AUnary, AAggregate,
+                                                  AppliedSymbol, UnappliedSymbol,StartAppliedSymbol,NowAppliedSymbol,NextAppliedSymbol,
+                                                  CauseFalseAppliedSymbol,CauseTrueAppliedSymbol,
+                                                  Number, Brackets, Date, Variable,
+                                                  TempLogic,ILFormula,DLFormula,
+                                                  CLFormula,NLFormula,XLFormula,FLFormula,GLFormula,ULFormula,WLFormula,RLFormula,
+                                                  NCFormula , CCFormula , DCFormula , ICFormula , AXFormula , EXFormula  , AFFormula,
+                                                  EFFormula , AGFormula , EGFormula , AUFormula , EUFormula,
+                                                  Structure, SymbolInterpretation,
+                                                  Enumeration, FunctionEnum, CSVEnumeration, FileEnumeration,
+                                                  TupleIDP, FunctionTuple, CSVTuple,
+                                                  ConstructedFrom, Constructor, Ranges,
+                                                  RangeElement, Display,
+
+                                                  Procedure, Call1, String,
+                                                  PyList, PyAssignment])
+    return _idpparser
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'idpparser':  # for compatibility
+        return get_idpparser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -40,7 +40,7 @@ from .Expression import (Expression, AppliedSymbol, AComparison,
                          TRUE, FALSE, BOOL_SETNAME, INT_SETNAME, REAL_SETNAME)
 from .Theory import Theory
 from .utils import OrderedSet, IDPZ3Error, NOT_SATISFIABLE
-from .Z3_to_IDP import z3_to_idp, get_interpretations
+from .Z3_to_IDP import z3_to_idp, ModelValues
 
 start = time.process_time()
 
@@ -170,7 +170,7 @@ def _propagate_inner(self, tag, solver, todo):
 
     if res1 == sat:
         model = solver.model()
-        interps = get_interpretations(self, model, as_z3=True)
+        values = ModelValues(self, model, as_z3=True)
         new_todo = list(todo.values())
         new_todo.extend(self._new_questions_from_model(model, self.assignments))
         valqs = []
@@ -178,9 +178,7 @@ def _propagate_inner(self, tag, solver, todo):
             if (isinstance(q, AppliedSymbol)
             and not q.is_reified()
             and not (q.in_enumeration or q.is_enumerated)):
-                assert q.symbol.name in interps, "Internal error"
-                maps, _else = interps[q.symbol.name]
-                val = maps.get(q.code, _else)  # val may be None
+                val = values.get(q)  # val may be None
             else:
                 val = None
             if val is None:
@@ -287,7 +285,7 @@ def _first_propagate(self, solver: Solver,
 
     # Generate model, and build a set of questions and their values.
     model = solver.model()
-    interps = get_interpretations(self, model, as_z3=True)
+    values = ModelValues(self, model, as_z3=True)
     new_todo = list(todo.values())
     new_todo.extend(self._new_questions_from_model(model, self.assignments))
     valqs = []
@@ -295,9 +293,7 @@ def _first_propagate(self, solver: Solver,
         if (isinstance(q, AppliedSymbol)
         and not q.is_reified()
         and not (q.in_enumeration or q.is_enumerated)):
-            assert q.symbol.name in interps, "Internal error"
-            maps, _else = interps[q.symbol.name]
-            val = maps.get(q.code, _else)  # val may be None
+            val = values.get(q)  # val may be None
         else:
             val = None
         if val is None:
@@ -26,6 +26,7 @@ from __future__ import annotations
 from copy import copy
 import gc
 import logging
+import os
 #from multiprocessing.managers import BaseManager
 from os import linesep
 import platform
@@ -35,6 +36,7 @@ import time
 import types
 from typing import Any, Iterator, List, Union, Optional
 import subprocess
+import tempfile
 from z3 import Solver
 
 from idp_engine.Expression import BOOL_SETNAME, FALSE, INT_SETNAME, ONE, OR, SETNAME, TRUE, VARIABLE, ZERO, AAggregate, AComparison, AConjunction, ADisjunction, AEquivalence, AFFormula, AGFormula, AIfExpr, AImplication, AMultDiv, APower, AQuantification, ARImplication, ASumMinus, AUFormula, AUnary, AXFormula, AppliedSymbol, Brackets, CCFormula, CLFormula, CTLFormula, DCFormula, DLFormula, EFFormula, EGFormula, EUFormula, EXFormula, Expression, FLFormula, ForNext, GLFormula, ICFormula, ILFormula, LFormula, NCFormula, NLFormula, NextAppliedSymbol, NowAppliedSymbol, Number, Operator, Quantee, RLFormula, SetName, StartAppliedSymbol, SymbolExpr, ULFormula, UnappliedSymbol, Variable, WLFormula, XLFormula
@@ -1622,43 +1624,46 @@ def ProveModalLogic(ltllogic:TempLogic,init_structure:Structure,theory:TheoryBlo
     #print(machine)
     ProbTransTime = time.time() - ProbTransTime
     
-    f = open("test.mch","w")
-    f.write(machine)
-    f.close()  
-    ProbSolvingTime = 0
-    reserrror= ""
-    resmessage = ""
-    osname = platform.system()
-    if generate_transition_machine:
-        #open('states.dot', 'w').close()
-        a = None
-        if osname == "Linux":
-            a =subprocess.run('./probcli.sh  test.mch -model-check -spdot states.dot',shell=True,capture_output=True)  
-        else:
-            a =subprocess.run('WinProb\probcli  test.mch -model-check -spdot states.dot',shell=True,capture_output=True)  
-        stsf = open('states.dot',"r")
-        resmessage = stsf.read()
-        stsf.close()
-        #resmessage = a.stdout.decode()
-        reserrror = a.stderr.decode()
-    #"(F {owns = owns \/ {(1,B1)}}) & G {F {john_owns=TRUE}}"
-    #ltlf = "(EF { (2,B1):owns })" 
-    ltlf = translateLogicFormula(ltllogic.formula,probnumset)
-    ProbSolvingTime = time.time()
-    #a = subprocess.run(f'C:\Prob\probcli --help ',shell=True,capture_output=True)
-    #a =subprocess.run('C:\Prob\probcli  test.mch -model-check -spdot states.dot',shell=True,capture_output=True)  
-    #a =subprocess.run('C:\Prob\probcli  test.mch -animate 20 -his history.txt',shell=True,capture_output=True)          
-    if isinstance(ltllogic.formula,(ILFormula,DLFormula,CLFormula,NLFormula,XLFormula,FLFormula,GLFormula,ULFormula,WLFormula,RLFormula)):
-        if osname == "Linux":
-            a = subprocess.run(f'./probcli.sh -ltlformula "{ltlf}" test.mch -disable_timeout',shell=True,capture_output=True) 
-        else:
-            a = subprocess.run(f'WinProb\probcli -ltlformula "{ltlf}" test.mch -disable_timeout',shell=True,capture_output=True) # -model-check -spdot states.dot
-    else:
-        if osname == "Linux":
-            a = subprocess.run(f'./probcli.sh -ctlformula "{ltlf}" test.mch -disable_timeout',shell=True,capture_output=True)
+    # the machine and its states are written in a scratch directory
+    with tempfile.TemporaryDirectory(prefix="idp_prob_") as tmpdir:
+        mch = os.path.join(tmpdir, "test.mch")
+        dot = os.path.join(tmpdir, "states.dot")
+        with open(mch, "w") as f:
+            f.write(machine)
+        ProbSolvingTime = 0
+        reserrror= ""
+        resmessage = ""
+        osname = platform.system()
+        if generate_transition_machine:
+            #open('states.dot', 'w').close()
+            a = None
+            if osname == "Linux":
+                a =subprocess.run(f'./probcli.sh  "{mch}" -model-check -spdot "{dot}"',shell=True,capture_output=True)
+            else:
+                a =subprocess.run(f'WinProb\probcli  "{mch}" -model-check -spdot "{dot}"',shell=True,capture_output=True)
+            stsf = open(dot,"r")
+            resmessage = stsf.read()
+            stsf.close()
+            #resmessage = a.stdout.decode()
+            reserrror = a.stderr.decode()
+        #"(F {owns = owns \/ {(1,B1)}}) & G {F {john_owns=TRUE}}"
+        #ltlf = "(EF { (2,B1):owns })" 
+        ltlf = translateLogicFormula(ltllogic.formula,probnumset)
+        ProbSolvingTime = time.time()
+        #a = subprocess.run(f'C:\Prob\probcli --help ',shell=True,capture_output=True)
+        #a =subprocess.run('C:\Prob\probcli  test.mch -model-check -spdot states.dot',shell=True,capture_output=True)  
+        #a =subprocess.run('C:\Prob\probcli  test.mch -animate 20 -his history.txt',shell=True,capture_output=True)          
+        if isinstance(ltllogic.formula,(ILFormula,DLFormula,CLFormula,NLFormula,XLFormula,FLFormula,GLFormula,ULFormula,WLFormula,RLFormula)):
+            if osname == "Linux":
+                a = subprocess.run(f'./probcli.sh -ltlformula "{ltlf}" "{mch}" -disable_timeout',shell=True,capture_output=True)
+            else:
+                a = subprocess.run(f'WinProb\probcli -ltlformula "{ltlf}" "{mch}" -disable_timeout',shell=True,capture_output=True) # -model-check -spdot states.dot
         else:
-            a = subprocess.run(f'WinProb\probcli -ctlformula "{ltlf}" test.mch -disable_timeout',shell=True,capture_output=True)
-    
+            if osname == "Linux":
+                a = subprocess.run(f'./probcli.sh -ctlformula "{ltlf}" "{mch}" -disable_timeout',shell=True,capture_output=True)
+            else:
+                a = subprocess.run(f'WinProb\probcli -ctlformula "{ltlf}" "{mch}" -disable_timeout',shell=True,capture_output=True)
+
     ProbSolvingTime = time.time() - ProbSolvingTime
     resmessage += a.stdout.decode()
     reserrror += a.stderr.decode()
@@ -2553,7 +2558,12 @@ def model_expand(*theories: Union[TheoryBlock, Structure, Theory],
                  timeout_seconds: int = 10,
                  complete: bool = False,
                  extended: bool = False,
-                 sort: bool = False
+                 sort: bool = False,
+                 grounding: Optional[str] = None,
+                 budget: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 table_size: Optional[int] = None,
+                 type_constraints: Optional[str] = None
                  ) -> Iterator[str]:
     """Returns a (possibly empty) list of models of the combination of theories,
     followed by a string message.
@@ -2581,11 +2591,21 @@ def model_expand(*theories: Union[TheoryBlock, Structure, Theory],
                 inequalities and quantified formula is of interest
                 (e.g. for the Interactive Consultant). Defaults to False.
         sort (bool, optional): True if the models should be in alphabetical order. Defaults to False.
+        grounding (str, optional): use `"lifted"` to keep the quantifications
+                over enumerated types in the Z3 formula (see `Theory`).
+                Defaults to `"full"`, or to the `--grounding` command line option.
+        budget (int, optional): maximum estimated number of atoms in the grounding (see `Theory`).
+        workers (int, optional): number of processes grounding the constraints (see `Theory`).
+        table_size (int, optional): minimum size of the function interpretations
+                translated as tables (see `Theory`).
+        type_constraints (str, optional): `"instance"` or `"sort"` (see `Theory`).
 
     Yields:
         str
     """
-    problem = Theory(*theories, extended=extended)
+    problem = Theory(*theories, extended=extended, grounding=grounding, budget=budget,
+                     workers=workers, table_size=table_size,
+                     type_constraints=type_constraints)
     PROCESS_TIMINGS['ground'] = time.time() - PROCESS_TIMINGS['ground']
 
     solve_start = time.time()
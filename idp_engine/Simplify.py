@@ -26,7 +26,6 @@ This module monkey-patches the Expression class and sub-classes.
 from __future__ import annotations
 
 from copy import copy, deepcopy
-import sys
 from typing import List, Tuple, Optional, Generator
 
 from .Expression import (Constructor, Expression, AIfExpr, IF,
@@ -35,7 +34,7 @@ from .Expression import (Constructor, Expression, AIfExpr, IF,
                          ASumMinus, AMultDiv, APower, AUnary, AAggregate,
                          SymbolExpr, AppliedSymbol, UnappliedSymbol, Variable,
                          Number, Date, Brackets, TRUE, FALSE, NOT, AND, OR,
-                         BOOL_SETNAME, INT_SETNAME, DATE_SETNAME)
+                         BOOL_SETNAME, INT_SETNAME, DATE_SETNAME, NO_VARIABLES)
 from .Parse import Enumeration, TupleIDP
 from .Assignments import Status as S, Assignment
 from .utils import ABS
@@ -58,12 +57,18 @@ def _change(self: Expression,
         return out
 
     if simpler is not None:
+        if simpler.is_shared:
+            simpler = copy(simpler)
+            simpler.is_shared = False
         simpler.original = self.original
         simpler.is_type_constraint_for = self.is_type_constraint_for
         if type(self) == AppliedSymbol:
             simpler.in_head = self.in_head
         return simpler
 
+    if self.is_shared:  # copy the shared atom before changing it
+        self = copy(self)
+        self.is_shared = False
     if sub_exprs is not None:
         self.sub_exprs = sub_exprs
     if ops is not None:
@@ -72,7 +77,7 @@ def _change(self: Expression,
         self.co_constraint = co_constraint
 
     # reset derived attributes
-    self.str = sys.intern(str(self))
+    self.str = None
 
     return self
 Expression._change = _change
@@ -427,7 +432,7 @@ def update_exprs(self: SymbolExpr,
             concept_decl = symbol.decl.concept_decl
             out = SymbolExpr.make(name=concept_decl.name)
             out.decl = concept_decl
-            out.variables = set()
+            out.variables = NO_VARIABLES
             return out
         else:
             return self._change(sub_exprs=[symbol])
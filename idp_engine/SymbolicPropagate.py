@@ -43,6 +43,10 @@ def simplify_with(self: Expression, assignments: Assignments, co_constraints_too
     if co_constraints_too and self.co_constraint is not None:
         co_constraint = self.co_constraint.simplify_with(assignments, co_constraints_too)
     new_e = [e.simplify_with(assignments, co_constraints_too) for e in self.sub_exprs]
+    if (all(e1 is e0 for e0, e1 in zip(self.sub_exprs, new_e))
+        and (co_constraint is None or co_constraint is self.co_constraint)):  # unchanged: no copy
+        ass = assignments.get(self.str, None)
+        return ass.value if ass and ass.value is not None else self
     self = copy(self)._change(sub_exprs=new_e, simpler=simpler, co_constraint=co_constraint)
     # calculate ass.value on the changed expression, as simplified sub
     # expressions may lead to stronger simplifications
@@ -23,25 +23,47 @@ Class to represent a collection of theory and structure blocks.
 """
 from __future__ import annotations
 
+import io
+import logging
+from hashlib import sha256
+import multiprocessing
+import pickle
+import sys
+import threading
 import time
 from copy import copy, deepcopy
 from enum import Enum, auto
 from itertools import chain
-from typing import Any, Iterator, List, Optional, Tuple, Union
-from z3 import (Context, BoolRef, ExprRef, Solver, sat, unsat, Optimize, Not,
-                And, Or, Implies, is_and, BoolVal, get_param, is_true)
+from os import path
+from typing import Any, Hashable, Iterator, List, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+from z3 import (AstRef, Context, BoolRef, ExprRef, Solver, sat, unsat, Optimize, Not,
+                And, Or, Implies, BoolVal, get_param,
+                is_quantifier, substitute_vars, Z3_OP_TRUE, Z3_OP_AND)
 
 from .Assignments import Status as S, Assignment, Assignments, str_to_IDP
 from .Expression import (TRUE, Expression, FALSE, AppliedSymbol, AComparison,
                          EQUALS, NOT, Extension, AQuantification,
                          BOOL_SETNAME, INT_SETNAME, REAL_SETNAME, DATE_SETNAME)
-from .Parse import (TypeDeclaration, Declaration, SymbolDeclaration, SymbolExpr,
-                    TheoryBlock, Structure, Definition,                     SymbolInterpretation)
+from .Idp_to_Z3 import decl_kind
+from .Parse import (IDP, TypeDeclaration, Declaration, SymbolDeclaration, SymbolExpr,
+                    TheoryBlock, Structure, Definition, SymbolInterpretation, FunctionEnum,
+                    Vocabulary, _PICKLE_RECURSION_LIMIT, _SHARED_NODES, _save_cached,
+                    _trusted, _IDPPickler, _IDPUnpickler)
 from .Simplify import join_set_conditions
 from .utils import (TIJD, OrderedSet, NEWL, INT, REAL, DATE, IDPZ3Error,
                     RESERVED_SYMBOLS, CONCEPT, GOAL_SYMBOL, RELEVANT,
-                    NOT_SATISFIABLE)
-from .Z3_to_IDP import z3_to_idp, collect_questions, get_interpretations
+                    NOT_SATISFIABLE, GROUNDING, Semantics)
+from .Z3_to_IDP import z3_to_idp, collect_questions, ModelValues
+
+logger = logging.getLogger(__name__)
+
+# the Z3 translations shared by the theories of a program, by program:
+# {program: {(vocabulary, options, types): [thread using them, Z3 context, translations]}}
+# (at most _MAX_TRANSLATIONS per program, the oldest being dropped)
+_TRANSLATIONS: WeakKeyDictionary[IDP, dict[Tuple, List[Any]]] = WeakKeyDictionary()
+_TRANSLATIONS_LOCK = threading.Lock()
+_MAX_TRANSLATIONS = 10
 
 
 class Propagation(Enum):
@@ -64,6 +86,29 @@ class Theory(object):
         extended (Bool): True when the truth value of inequalities
             and quantified formula is of interest (e.g. in the Interactive Consultant)
 
+        grounding (str): "lifted" when the quantifications over enumerated types are not expanded
+
+        strategy (str): the grounding requested by the user ("full", "lifted" or "auto")
+
+        budget (int, optional): maximum estimated number of atoms in the grounding
+
+        estimates (dict[str, int]): estimated number of atoms in the grounding
+            of each constraint and definition
+
+        workers (int): number of processes used to ground the constraints
+
+        table_size (int, optional): minimum number of tuples in a function interpretation
+            for it to be translated as a table
+
+        tables (set[str]): the functions whose interpretation is translated as a table,
+            i.e., as a Z3 function with asserted values
+
+        type_constraints (str): "instance" to constrain the value of each instance
+            of a function to its range, or "sort" to constrain all instances at once
+
+        sort_constraints (dict[str, Expression]): the type constraint of each function,
+            when they are at the sort level
+
         declarations (dict[str, Declaration]): the list of type and symbol declarations
 
         constraints (OrderedSet): a set of assertions.
@@ -73,6 +118,9 @@ class Theory(object):
         interpretations (dict[string, SymbolInterpretation]):
             A mapping of enumerated symbols to their interpretation.
 
+        derived (set[str]): the defined predicates whose interpretation
+            was computed from their definition (see `Definition.materialize`)
+
         extensions (dict[string, Extension]):
             Extension of types and predicates
 
@@ -91,6 +139,18 @@ class Theory(object):
 
         ctx : Z3 context
 
+        atom_keys (dict[str, Tuple[Tuple[int, ...], List[ExprRef]]]): mapping from
+            the code of a ground atom to the ids of its Z3 arguments,
+            to look up its value in a model (see ModelValues)
+
+        z3_values (dict[str, dict[int, Tuple[ExprRef, Optional[Expression]]]]): the IDP values
+            of the Z3 values found in models, by type name and id of the Z3 value (see z3_to_idp)
+
+        voc (Vocabulary, optional): the vocabulary of the first block of the theory.
+            The theories of a program with the same vocabulary, the same options and
+            the same interpretations of types share their Z3 context and translations
+            (see `_share_translations`).
+
         previous_assignments (Assignment): assignment after previous full propagation
 
         satisfied (Bool): whether propagate found an initial model
@@ -121,19 +181,72 @@ class Theory(object):
 
     def __init__(self,
                  *theories: Union[TheoryBlock, Structure, Theory],
-                 extended: bool = False
+                 extended: bool = False,
+                 grounding: Optional[str] = None,
+                 budget: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 table_size: Optional[int] = None,
+                 type_constraints: Optional[str] = None
                  ) -> None:
         """Creates an instance of ``Theory`` for the list of theories, e.g., ``Theory(T,S)``.
 
+        When the theories are blocks of a program parsed with a ``cache_dir``
+        (see ``IDP.from_str``), the grounded theory is stored in the cache, next to the program,
+        and reloaded from it the next time the same blocks are grounded with the same options.
+
+        The options that are not given default to the options of the program
+        of the first block (see ``IDP.options``).
+
         Args:
             theories (Union[TheoryBlock, Structure, Theory]): 1 or more (data) theories.
             extended (bool, optional): use `True` when the truth value of
                 inequalities and quantified formula is of interest
                 (e.g. for the Interactive Consultant).
                 Defaults to False.
+            grounding (str, optional): use `"lifted"` to keep the quantifications
+                over enumerated types (e.g., `type T := {a,b,c}`) in the Z3 formula,
+                instead of expanding them.  The formula is then smaller,
+                but harder to solve.
+                Use `"auto"` to use the lifted grounding only when the full grounding
+                would exceed the budget.
+                Defaults to `"full"`, or to the `--grounding` command line option.
+            budget (int, optional): maximum number of atoms in the grounding,
+                as estimated before grounding.
+                An IDPZ3Error is raised when the estimate exceeds the budget.
+                Defaults to no budget, or to the `--grounding-budget` command line option.
+            workers (int, optional): number of processes used to ground
+                the constraints in parallel, on platforms that can fork processes.
+                Defaults to 1, or to the `--grounding-workers` command line option.
+            table_size (int, optional): minimum number of tuples in the interpretation
+                of a function for it to be translated once, as a Z3 function with
+                asserted values, instead of an if-then-else expression
+                at each application of the function to unknown arguments.
+                Defaults to no such translation, or to the `--function-tables` command line option.
+            type_constraints (str, optional): use `"sort"` to constrain the values
+                of a function to its range by one quantified formula,
+                instead of one formula per instance of the function.
+                This is ignored when the theory is extended.
+                Defaults to `"instance"`, or to the `--type-constraints` command line option.
         """
+        idp = _program(theories)
+        options = {**GROUNDING, **(getattr(idp, 'options', None) or {})}
+        self.strategy: str = grounding or options['strategy']
+        assert self.strategy in ["full", "lifted", "auto"], \
+            f"Unknown grounding: {self.strategy}"
 
         self.extended: Optional[bool] = extended
+        self.grounding: str = "lifted" if self.strategy == "lifted" else "full"
+        self.budget: Optional[int] = budget if budget is not None else options['budget']
+        self.estimates: dict[str, int] = {}
+        self._sizes: Optional[List[int]] = options.get('sizes', None)  # see IDP.options
+        self.workers: int = workers or options['workers']
+        self.table_size: Optional[int] = (table_size if table_size is not None
+                                          else options['tables'])
+        self.tables: set[str] = set()
+        self.type_constraints: str = type_constraints or options['type_constraints']
+        assert self.type_constraints in ["instance", "sort"], \
+            f"Unknown type constraints: {self.type_constraints}"
+        self.sort_constraints: dict[str, Expression] = {}
 
         self.declarations: dict[str, Declaration] = {}
         self.definitions: List[Definition] = []
@@ -142,15 +255,24 @@ class Theory(object):
         self.def_constraints: dict[Tuple[SymbolDeclaration, Definition], List[Expression]] = {}
         self.interpretations: dict[str, SymbolInterpretation] = {}  # interpretations given by user
         self.extensions: dict[str, Extension] = {}  # computed extension of types and predicates
+        self.ground_terms: dict[Hashable, Expression] = {}  # hash-consing of ground atoms, by key
+        self.derived: set[str] = set()  # predicates computed from their definition
         self.name: str = ''
+        self.voc: Optional[Vocabulary] = None
 
         self._contraintz: Optional[List[BoolRef]] = None
         self._formula: Optional[BoolRef] = None  # the problem expressed in one logic formula
         self.co_constraints: Optional[OrderedSet] = None  # Constraints attached to subformula. (see also docs/zettlr/Glossary.md)
 
         self.z3: dict[str, ExprRef] = {}
-        self.ctx: Context = Context()
-        self.add(*theories)
+        self.ctx: Context = None  # see _share_translations
+        self.atom_keys: dict[str, Tuple[Tuple[int, ...], List[ExprRef]]] = {}  # see ModelValues
+        self.z3_values: dict[str, dict[int, Tuple[ExprRef, Optional[Expression]]]] = {}
+        self._shared_constraints: bool = False  # with a copy of the theory
+        cached = self._cached_grounding(theories)
+        loaded = cached is not None and self._load_grounding(*cached)
+        if not loaded:
+            self.add(*theories)
         
         self.previous_assignments: Assignments = Assignments()
 
@@ -164,6 +286,9 @@ class Theory(object):
         self.expl_reifs: dict[BoolRef, Tuple[BoolRef,Expression]] = {}  # {reified: (constraint, original)}
         self.ignored_laws: set[str] = set()
 
+        if cached and not loaded:
+            self._save_grounding(*cached)
+
     @property
     def solver(self) -> Solver:
         "Beware that the setting of timeout_seconds (e.g. in expand()) is not thread safe"
@@ -207,6 +332,10 @@ class Theory(object):
                 p = constraint.reified(self)
                 self.expl_reifs[p] = (constraint.translate(self), constraint)
                 self._reif.add(Implies(p, self.expl_reifs[p][0]))
+            for name, constraint in self.sort_constraints.items():
+                p = constraint.reified(self)
+                self.expl_reifs[p] = (And(self._instantiate(name)), constraint)
+                self._reif.add(Implies(p, self.expl_reifs[p][0]))
 
         return self._reif
 
@@ -224,25 +353,45 @@ class Theory(object):
         """Returns an independent copy of a theory.
         """
         out = copy(self)
-        out.assignments = self.assignments.copy()
-        out.constraints = OrderedSet(deepcopy(c) for c in self.constraints)
+        # the expressions are shared: the constraints are copied
+        # when they are about to be modified in place (see _own_constraints)
+        out.assignments = self.assignments.copy(shallow=True)
+        out.constraints = copy(self.constraints)
+        self._shared_constraints, out._shared_constraints = True, True
         out.declarations = {k:copy(v) for k,v in out.declarations.items()}
         out.interpretations = copy(out.interpretations)
+        out.derived = copy(out.derived)
         out.def_constraints = {k:[e for e in v]  #TODO e.copy()
                                for k,v in self.def_constraints.items()}
         # copy() is called before making substitutions => invalidate derived fields
         out._formula = None
         return out
 
+    def _own_constraints(self) -> None:
+        """Copies the constraints shared with a copy of the theory,
+        before they are modified in place (e.g., by re-interpretation)"""
+        if self._shared_constraints:
+            self.constraints = OrderedSet(deepcopy(c) for c in self.constraints)
+            self._shared_constraints = False
+
     def add(self, *theories: Union[TheoryBlock, Structure, Theory]) -> Theory:
         """Adds a list of theories to the theory.
 
         Args:
             theories (Union[TheoryBlock, Structure, Theory]): 1 or more (data) theories.
         """
+        self._own_constraints()
+        if self._add_incrementally(theories):
+            return self
+
+        # the derived predicates are re-computed with the new interpretations
+        for name in self.derived:
+            del self.interpretations[name]
+        self.derived = set()
         for block in theories:
             #print("th1")
             self.z3 = {}
+            self.voc = self.voc or getattr(block, 'voc', None)
             self._formula = None  # need to reapply the definitions
             for name, decl in block.declarations.items():
                 assert (name not in self.declarations
@@ -276,14 +425,21 @@ class Theory(object):
         ### apply the enumerations and definitions
         self.assignments = Assignments()
         self.extensions = {}  # reset the cache
+        self.ground_terms = {}
+        self.tables = set()
+        self.sort_constraints = {}
         #print("th5")
         # Create a set of all the symbols which are defined in the theory.
         def_vars = [definition.def_vars.keys() for definition in self.definitions]
         defined_symbols = {x: x for sublist in def_vars for x in sublist}
 
+        self._share_translations()
+
         # Interpret the vocabulary
         for symbol, decl in self.declarations.items():
             decl.interpret(self)
+
+        self._estimate_grounding()
         #print("problem extension::")
         #print(self.extensions)
         # remove RELEVANT constraints
@@ -313,8 +469,7 @@ class Theory(object):
         # initialize assignments, co_constraints, questions
 
         self.co_constraints, questions = OrderedSet(), OrderedSet()
-        self.constraints = OrderedSet([v.interpret(self, {})
-                                       for v in self.constraints])
+        self.constraints = OrderedSet(_interpret_all(self, list(self.constraints)))
         for c in self.constraints:
             c.collect_co_constraints(self.co_constraints)
             # don't collect questions from type constraints
@@ -323,8 +478,7 @@ class Theory(object):
         for es in self.def_constraints.values():
             for e in es:
                 e.collect_co_constraints(self.co_constraints)
-        self.co_constraints = OrderedSet([c.interpret(self, {})
-                                          for c in self.co_constraints])
+        self.co_constraints = OrderedSet(_interpret_all(self, list(self.co_constraints)))
         
         for s in list(questions.values()):
             if s.code not in self.assignments:
@@ -333,6 +487,221 @@ class Theory(object):
         self._constraintz = None
         return self
 
+    def _share_translations(self) -> None:
+        """Uses the Z3 context and translations of the other theories of the program
+        with the same vocabulary, the same options and the same interpretations of types.
+
+        The translations are keyed by the code of the expressions,
+        whose meaning only depends on the declarations and on the types.
+        A Z3 context is not thread safe: the translations are used by one thread at a time,
+        the other threads using their own context meanwhile.
+        They are not shared when there are recursive definitions,
+        because these are added to the Z3 context.
+        """
+        idp = getattr(self.voc, 'idp', None)
+        if (idp is None
+            or any(defin.mode == Semantics.RECDATA for defin in self.definitions)):
+            self.ctx, self.z3 = Context(), {}
+        else:
+            key = (self.voc, self.extended, self.strategy, self.budget,
+                   self.table_size, self.type_constraints,
+                   tuple((name, str(self.interpretations[name].enumeration)
+                                if type(decl) == TypeDeclaration
+                                and name in self.interpretations else None)
+                         for name, decl in self.declarations.items()))
+            current = threading.current_thread()
+            with _TRANSLATIONS_LOCK:
+                shared = _TRANSLATIONS.setdefault(idp, {})
+                entry = shared.get(key, None)
+                if entry is None:
+                    if _MAX_TRANSLATIONS <= len(shared):
+                        del shared[next(iter(shared))]  # the oldest
+                    entry = shared[key] = [current, Context(), {}]
+                if entry[0] is not current and entry[0].is_alive():  # in use
+                    self.ctx, self.z3 = Context(), {}
+                else:
+                    entry[0] = current
+                    self.ctx, self.z3 = entry[1], entry[2]
+        self.atom_keys, self.z3_values = {}, {}
+        self._formula, self._constraintz = None, None
+        self._slvr, self._optmz, self._reif, self._optmz_reif = None, None, None, None
+        self.expl_reifs = {}
+
+    def _cached_grounding(self, theories: Tuple[Union[TheoryBlock, Structure, Theory], ...]
+                          ) -> Optional[Tuple[IDP, str]]:
+        """Returns the program whose cache stores the grounding of the theories,
+        with the file of the grounding, or None if the grounding is not cached.
+
+        The grounding is cached when the theories are blocks of a program
+        with an on-disk cache, without recursive definitions.
+        The name of its file depends on the program, on the names and content of the blocks,
+        and on the options of the theory.
+        """
+        idp = _program(theories)
+        if idp is None or getattr(idp, 'cache_file', None) is None:
+            return None
+        blocks = list(idp.theories.values()) + list(idp.structures.values())
+        if (any(all(block is not b for b in blocks) for block in theories)
+            or any(defin.mode == Semantics.RECDATA for block in theories
+                   if type(block) == TheoryBlock for defin in block.definitions)):
+            return None
+        content = [self.extended, self.strategy, self.budget, self.table_size,
+                   self.type_constraints]
+        for block in theories:
+            content.append((type(block).__name__, block.name))
+            if type(block) == TheoryBlock:
+                content.extend(str(e) for e in chain(
+                    block.constraints,
+                    (rule for defin in block.definitions for rule in defin.rules)))
+            else:
+                content.extend((str(i), str(i.default)) for i in block.interpretations.values())
+        key = sha256(repr(content).encode('utf-8')).hexdigest()
+        return idp, idp.cache_file.replace(".idp.pickle", f".{key}.grounding.pickle")
+
+    def _load_grounding(self, idp: IDP, cache_file: str) -> bool:
+        """Takes the grounding stored in the cache of the program, if any.
+
+        The constraints are translated to Z3 when needed, as after `add`.
+
+        Returns:
+            bool: whether the grounding was in the cache
+        """
+        if not path.exists(cache_file):
+            return False
+        limit = sys.getrecursionlimit()
+        try:
+            if not _trusted(cache_file):
+                return False
+            sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+            with open(cache_file, "rb") as f:
+                theory, states = _GroundingUnpickler(f, idp).load()
+        except (OSError, EOFError, RecursionError, pickle.UnpicklingError,
+                AttributeError, ImportError, IndexError, KeyError,
+                TypeError, ValueError):  # corrupted or stale cache entry
+            return False
+        finally:
+            sys.setrecursionlimit(limit)
+        for obj, state in states:  # the declarations and definitions, as interpreted
+            for name, value in state.items():
+                setattr(obj, name, value)
+        self.__dict__.update(theory.copy().__dict__)
+        self.declarations = dict(theory.declarations)  # not copies, as in `add`
+        self._check_budget()
+        self._share_translations()
+        for decl in self.declarations.values():
+            if type(decl) == TypeDeclaration:
+                decl.translate(self)  # as in `interpret`
+        return True
+
+    def _save_grounding(self, idp: IDP, cache_file: str) -> None:
+        """Stores the grounding of the theory in the cache of the program,
+        with the state of the declarations and definitions after grounding"""
+        theory = self.copy()
+        theory.declarations = dict(self.declarations)
+        theory.assignments = self.assignments.copy()
+        theory.z3, theory.ctx, theory._formula, theory._constraintz = {}, None, None, None
+        theory.atom_keys, theory.z3_values = {}, {}
+        theory._slvr, theory._optmz, theory._reif, theory._optmz_reif = None, None, None, None
+        theory.expl_reifs = {}
+        states = [(obj, _state(obj))
+                  for obj in chain(self.declarations.values(), self.definitions)]
+        _save_cached(cache_file, (theory, states),
+                     lambda f: _GroundingPickler(f, _program_objects(idp)))
+
+    def _add_incrementally(self, theories: Tuple[Union[TheoryBlock, Structure, Theory], ...]
+                           ) -> bool:
+        """Adds the theories without re-interpreting the whole theory, when possible.
+
+        This is possible when the theories only add constraints,
+        and interpretations of symbols that are not types,
+        not domains of other symbols, and not used in definitions.
+        Only the constraints with such a symbol are then re-interpreted,
+        and the Z3 translations of the other constraints are kept.
+
+        Args:
+            theories (Tuple[Union[TheoryBlock, Structure, Theory], ...]): the theories to add
+
+        Returns:
+            bool: whether the theories were added
+        """
+        if (self.co_constraints is None or self.strategy == "auto"
+            or any(a.status not in [S.UNKNOWN, S.STRUCTURE, S.UNIVERSAL]
+                   for a in self.assignments.values())):
+            return False
+
+        changed: dict[str, SymbolInterpretation] = {}
+        for block in theories:
+            if (type(block) not in [TheoryBlock, Structure]
+                or any(self.declarations.get(name, None) != decl
+                       for name, decl in block.declarations.items())
+                or (type(block) == TheoryBlock
+                    and (block.definitions or block.def_constraints))):
+                return False
+            for name, interpret in block.interpretations.items():
+                if self.interpretations.get(name, None) != interpret:
+                    changed[name] = interpret
+
+        # the symbols that the interpretation of other symbols depends on
+        used: dict[str, SymbolDeclaration] = {}
+        for definition in self.definitions:
+            for rule in definition.rules:
+                for e in [rule.definiendum, rule.body, rule.out]:
+                    if e is not None:
+                        e.collect_symbols(used, co_constraints=False)
+        for decl in self.declarations.values():
+            if type(decl) == SymbolDeclaration:
+                used.update((s.name, s) for s in decl.domains + [decl.codomain])
+        if any(name in self.interpretations or name in used
+               or name in RESERVED_SYMBOLS
+               or type(self.declarations.get(name, None)) != SymbolDeclaration
+               for name in changed):
+            return False
+
+        # the caches are not shared with copies of the theory
+        self.extensions = copy(self.extensions)
+        self.ground_terms = {}
+        self._formula, self._constraintz = None, None
+        self._slvr, self._optmz, self._reif, self._optmz_reif = None, None, None, None
+        self.expl_reifs = {}
+
+        # apply the new interpretations, in the order of the declarations
+        constraints, tables = list(self.constraints), self.tables
+        self.tables = copy(tables)
+        for name in self.declarations:
+            if name in changed:
+                self.interpretations[name] = changed[name]
+                changed[name].interpret(self)  # may add range constraints
+        if self.tables != tables:  # the tabled symbols are translated differently
+            self.z3 = {}
+
+        # re-interpret the constraints with a changed symbol
+        todo = [i for i, c in enumerate(constraints)
+                if not set(changed).isdisjoint(c.collect_symbols(co_constraints=False))]
+        new = (list(self.constraints)[len(constraints):]
+               + [deepcopy(v) for block in theories if type(block) == TheoryBlock
+                  for v in block.constraints])
+        self.estimates.update((c.annotations.get('reading', c.code), c.grounding_size(self))
+                              for c in new)
+        self._check_budget()
+
+        interpreted = _interpret_all(self, [constraints[i] for i in todo] + new)
+        for i, c in zip(todo, interpreted):
+            constraints[i] = c
+        new = interpreted[len(todo):]
+        self.constraints = OrderedSet(constraints + new)
+
+        co_constraints, questions = OrderedSet(), OrderedSet()
+        for c in new:
+            c.collect_co_constraints(co_constraints)
+            if not c.is_type_constraint_for:
+                c.collect(questions, all_=False)
+        self.co_constraints = OrderedSet(chain(self.co_constraints,  # not shared with copies
+                                               _interpret_all(self, list(co_constraints))))
+        for s in list(questions.values()):
+            if s.code not in self.assignments:
+                self.assignments.assert__(s, None, S.UNKNOWN)
+        return True
+
     def to_smt_lib(self) -> str:
         """Returns an SMT-LIB version of the theory
         """
@@ -360,6 +729,59 @@ class Theory(object):
             self.assignments.assert__(atom, val, status)
         self._formula = None
 
+    def assert_structure(self, structure: Structure) -> Theory:
+        """Asserts the values given by a structure, without grounding the theory again.
+
+        This allows grounding a theory once, with the symbols of the structure left
+        uninterpreted, and reusing it for many structures of the same vocabulary, e.g.:
+
+        .. code::
+
+            template = Theory(T)
+            for S in structures:
+                for model in template.assert_structure(S).expand(max=1):
+                    print(model)
+
+        The values are asserted with the ``GIVEN`` status, and are added to the solver
+        within a push/pop scope by ``expand()`` and ``propagate()``.
+        The values given or derived before are retracted.
+
+        Args:
+            structure (Structure): the structure to assert
+
+        Raises:
+            IDPZ3Error: if the structure interprets a type or a symbol interpreted in the theory
+        """
+        for a in self.assignments.values():
+            if a.status in [S.GIVEN, S.EXPANDED, S.CONSEQUENCE, S.ENV_CONSQ]:
+                self.assignments.assert__(a.sentence, None, S.UNKNOWN)
+        self.previous_assignments = Assignments()
+        self._formula = None
+
+        for name, interpretation in structure.interpretations.items():
+            if (name in [INT, REAL, DATE, CONCEPT, TIJD]
+                or self.interpretations.get(name, None) == interpretation):
+                continue
+            decl = self.declarations.get(name, None)
+            if (type(decl) != SymbolDeclaration or name in self.interpretations
+                or decl.instances is None):
+                raise IDPZ3Error(f"Can't assert the interpretation of {name} "
+                                 f"in {structure.name}: it must be a symbol with a "
+                                 f"finite domain, not interpreted in the theory")
+            values = ({} if interpretation.default is None else
+                      {code: interpretation.default for code in decl.instances})
+            for t in interpretation.enumeration.tuples:
+                args, value = ((t.args[:-1], t.args[-1])
+                               if type(interpretation.enumeration) == FunctionEnum else
+                               (t.args, TRUE))
+                atom = AppliedSymbol.make(decl.symbol_expr, args, type_check=False)
+                if atom.code not in decl.instances:
+                    raise IDPZ3Error(f"{atom} is not in the domain of {name}")
+                values[atom.code] = value
+            for code, value in values.items():
+                self.assignments.assert__(decl.instances[code], value, S.GIVEN)
+        return self
+
     def enable_law(self, code: str):
         """Enables a law, represented as a code string taken from the output of explain(...).
 
@@ -402,9 +824,10 @@ class Theory(object):
 
             def collect_constraints(e, constraints):
                 """collect constraints in e, flattening conjunctions"""
-                if is_true(e):
+                kind = decl_kind(e)
+                if kind == Z3_OP_TRUE:
                     return
-                if is_and(e):
+                if kind == Z3_OP_AND:
                     for e1 in e.children():
                         collect_constraints(e1, constraints)
                 else:
@@ -415,9 +838,79 @@ class Theory(object):
                 collect_constraints(e.translate(self), self._constraintz)
             self._constraintz += [s.translate(self)
                             for s in chain(*self.def_constraints.values())]
+            # the values of the functions translated as tables
+            if self.tables:
+                self._constraintz += [a.formula().translate(self)
+                                      for a in self.assignments.values()
+                                      if a.status == S.STRUCTURE
+                                      and a.symbol_decl.name in self.tables]
+            # the type constraints at the sort level
+            for name in self.sort_constraints:
+                self._constraintz += self._instantiate(name)
 
         return self._constraintz
 
+    def _instantiate(self, name: str) -> List[BoolRef]:
+        """returns the type constraint of symbol `name` at the sort level,
+        instantiated in Z3 for each instance of the symbol"""
+        formula = self.sort_constraints[name].translate(self)
+        if not is_quantifier(formula):
+            return [formula]
+        body = formula.body()
+        return [substitute_vars(body, *reversed([arg.translate(self)
+                                                 for arg in instance.sub_exprs]))
+                for instance in self.declarations[name].instances.values()]
+
+    def estimate_grounding(self) -> int:
+        """Returns the number of atoms in the grounding of the theory,
+        as estimated before grounding it.
+
+        Returns:
+            int: the estimated number of atoms
+        """
+        return sum(self.estimates.values())
+
+    def _estimate_grounding(self) -> None:
+        """Estimates the number of atoms in the grounding of the theory,
+        and checks it against the budget.
+
+        The grounding is lifted when it is over budget and the strategy is `"auto"`.
+
+        Raises:
+            IDPZ3Error: if the estimate exceeds the budget
+        """
+        if self.strategy == "auto":
+            self.grounding = "full"
+        while True:
+            self.estimates = {c.annotations.get('reading', c.code): c.grounding_size(self)
+                              for c in self.constraints}
+            self.estimates.update(
+                (f"definition of {', '.join(decl.name for decl in d.canonicals)}",
+                 d.grounding_size(self))
+                for d in self.definitions)
+            size = sum(self.estimates.values())
+            if (self.budget is None or size <= self.budget
+                or self.grounding == "lifted" or self.strategy != "auto"):
+                break
+            self.grounding = "lifted"  # and try again
+        self._check_budget()
+
+    def _check_budget(self) -> None:
+        """Checks the estimated size of the grounding against the budget.
+
+        Raises:
+            IDPZ3Error: if the estimate exceeds the budget
+        """
+        size = sum(self.estimates.values())
+        if self._sizes is not None:
+            self._sizes.append(size)
+        if self.budget is not None and self.budget < size:
+            largest = sorted(self.estimates.items(), key=lambda e: -e[1])[:3]
+            raise IDPZ3Error(
+                f"The grounding is estimated at {size} atoms, "
+                f"over the budget of {self.budget}.  Largest:"
+                + "".join(f"{NEWL}  {n} atoms for {c}" for c, n in largest))
+
     def formula(self) -> BoolRef:
         """ Returns a Z3 object representing the logic formula equivalent to the theory.
 
@@ -507,7 +1000,7 @@ class Theory(object):
         """
         ass = copy(self.assignments)
         model = solver.model()
-        interps = get_interpretations(self, model, as_z3=False)
+        values = ModelValues(self, model, as_z3=False)
         todo.extend(self._new_questions_from_model(model, ass))
         for q in todo:
             q_is_reified = q.is_reified()
@@ -519,10 +1012,8 @@ class Theory(object):
                 a.value, a.tag, a.relevant = None, S.UNKNOWN, False
             else:
                 if (isinstance(q, AppliedSymbol)
-                and not (q.in_enumeration or q.is_enumerated)
-                and q.symbol.name in interps):
-                    maps, _else = interps[q.symbol.name]
-                    val = maps.get(q.code, _else)
+                and not (q.in_enumeration or q.is_enumerated)):
+                    val = values.get(q)
                 else:
                     val = None
                 if val is None:
@@ -530,7 +1021,7 @@ class Theory(object):
                         val1 = model.eval(q.reified(self), model_completion=complete)
                     else:
                         val1 = model.eval(q.translate(self), model_completion=complete)
-                    val = z3_to_idp(val1, q.type)
+                    val = z3_to_idp(val1, q.type, self.z3_values)
 
                 if val is not None:
                     if q.is_assignment() and val == FALSE:  # consequence of the TRUE assignment
@@ -762,6 +1253,7 @@ class Theory(object):
         Args:
             tag (S): the status of propagated assignments
         """
+        self._own_constraints()
         for c in self.constraints:
             # determine consequences, including from co-constraints
             new_constraint = c.substitute(TRUE, TRUE, self.assignments, tag)
@@ -830,7 +1322,7 @@ class Theory(object):
 
         #  remove current assignments to same term
         backup = self.assignments
-        self.assignments = self.assignments.copy()
+        self.assignments = self.assignments.copy(shallow=True)
         removed = []
         if self.assignments[term].value:
             for k,a in self.assignments.items():
@@ -1226,4 +1718,219 @@ class Theory(object):
     def EN(self) -> str:
         pass
 
+
+def _program(theories: Tuple[Union[TheoryBlock, Structure, Theory], ...]) -> Optional[IDP]:
+    """returns the program of the first block of `theories`, if any"""
+    return getattr(getattr(theories[0], 'voc', None), 'idp', None) if theories else None
+
+
+# Parallel grounding  #########################################################
+
+# (problem, expressions, shared objects) of the current parallel grounding,
+# inherited by the forked processes
+_JOB: Optional[Tuple[Theory, List[Expression], dict[int, Any]]] = None
+
+
+def _interpret_all(problem: Theory, exprs: List[Expression]) -> List[Expression]:
+    """returns the interpretation of `exprs` in `problem`,
+    computed by `problem.workers` processes when possible.
+
+    The processes are forked, so that they share the problem with the parent.
+    They return their groundings in pickled form, in which the objects
+    that existed before the fork are referenced by id instead of being copied.
+    They also return the ground atoms and the instances of definitions that they created,
+    which are added to `problem.ground_terms` and to the caches of the definitions.
+    Their other side effects on the shared objects, e.g., the indexes of the enumerations,
+    are lost: the parent computes them again when needed.
+
+    Raises:
+        IDPZ3Error: when the interpretation of an expression fails
+    """
+    workers = min(problem.workers, len(exprs))
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return [e.interpret(problem, {}) for e in exprs]
+
+    # balance the groups of expressions by estimated grounding size
+    groups: List[List[int]] = [[] for _ in range(workers)]
+    loads = [0] * workers
+    sizes = [e.grounding_size(problem) for e in exprs]
+    for i in sorted(range(len(exprs)), key=lambda i: -sizes[i]):
+        group = loads.index(min(loads))
+        groups[group].append(i)
+        loads[group] += sizes[i]
+
+    # the expressions are interpreted in place: they can't be shared
+    private, todo = set(), list(exprs)
+    while todo:
+        e = todo.pop()
+        if id(e) not in private:
+            private.add(id(e))
+            todo.extend(e.sub_exprs)
+            todo.extend(getattr(e, 'quantees', []))
+            if e.co_constraint is not None:
+                todo.append(e.co_constraint)
+    shared = _shared_objects(problem, private)
+
+    global _JOB
+    _JOB = (problem, exprs, shared)
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.map(_interpret_group, groups)
+        out: List[Expression] = [None] * len(exprs)
+        for group, data in zip(groups, results):
+            interpreted, terms, caches = _SharedUnpickler(data, shared).load()
+            for i, e in zip(group, interpreted):
+                out[i] = e
+            for key, term in terms.items():
+                problem.ground_terms.setdefault(key, term)
+            for definition, cache in zip(problem.definitions, caches):
+                for key, instance in cache.items():
+                    definition.cache.setdefault(key, instance)
+        return out
+    except IDPZ3Error:  # an error in the theory: report it as usual
+        raise
+    except Exception as exc:
+        logger.warning(f"Parallel grounding failed ({exc!r}): grounding sequentially")
+        return [e.interpret(problem, {}) for e in exprs]
+    finally:
+        _JOB = None
+
+
+def _shared_objects(problem: Theory, private: set[int]) -> dict[int, Any]:
+    """returns the objects of the engine reachable from the vocabularies,
+    structures and definitions of `problem`, or from the shared nodes of the engine,
+    indexed by id, except the `private` ones."""
+    todo: List[Any] = [problem, *problem.declarations.values(),
+                       *problem.interpretations.values(),
+                       *problem.definitions, *problem.ground_terms.values(),
+                       *_SHARED_NODES.values()]
+    shared: dict[int, Any] = {}
+    seen = set(private)
+    while todo:
+        o = todo.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        if isinstance(o, (list, tuple, set, frozenset)):
+            todo.extend(o)
+        elif isinstance(o, dict):
+            todo.extend(o.keys())
+            todo.extend(o.values())
+        elif type(o).__module__.startswith(('idp_engine', 'textx')):
+            shared[id(o)] = o
+            if isinstance(o, Expression):
+                todo.extend(value for _, value in o._attributes())
+            else:
+                todo.extend(getattr(o, '__dict__', {}).values())
+    return shared
+
+
+def _interpret_group(group: List[int]) -> bytes:
+    """interprets a group of expressions of `_JOB`, in a forked process,
+    and returns them with the ground atoms and instances of definitions it created"""
+    problem, exprs, shared = _JOB
+    terms = set(problem.ground_terms)
+    caches = [set(definition.cache) for definition in problem.definitions]
+    try:
+        out = [exprs[i].interpret(problem, {}) for i in group]
+    except IDPZ3Error as exc:  # without its node, which is not pickled
+        raise IDPZ3Error(str(exc), error=exc.error) from None
+    new_terms = {key: term for key, term in problem.ground_terms.items()
+                 if key not in terms}
+    new_caches = [{key: instance for key, instance in definition.cache.items()
+                   if key not in cache}
+                  for definition, cache in zip(problem.definitions, caches)]
+    limit = sys.getrecursionlimit()
+    try:
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        file = io.BytesIO()
+        _SharedPickler(file, shared).dump((out, new_terms, new_caches))
+        return file.getvalue()
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+# Cached groundings  ##########################################################
+
+def _state(obj: Any) -> dict[str, Any]:
+    """returns the attributes of a declaration or definition, in its slots and in its __dict__,
+    except its Z3 objects, which are translated again when the grounding is loaded"""
+    attributes = obj._attributes() if isinstance(obj, Expression) else obj.__dict__.items()
+    return {name: value for name, value in attributes
+            if not isinstance(value, (AstRef, Context))}
+
+
+def _program_objects(idp: IDP) -> dict[Tuple[str, ...], Any]:
+    """returns the objects of a program that a cached grounding refers to, by path.
+
+    They are pickled by reference, so that they keep their identity
+    when the grounding is loaded in the same program, possibly in another process.
+    """
+    out: dict[Tuple[str, ...], Any] = {}
+    for name, voc in idp.vocabularies.items():
+        out[("vocabulary", name)] = voc
+        for decl_name, decl in voc.symbol_decls.items():
+            out[("declaration", name, decl_name)] = decl
+    for kind, blocks in (("theory", idp.theories), ("structure", idp.structures)):
+        for name, block in blocks.items():
+            out[(kind, name)] = block
+            for symbol, interpretation in block.interpretations.items():
+                out[(kind, name, "interpretation", symbol)] = interpretation
+            for i, definition in enumerate(getattr(block, 'definitions', [])):
+                out[(kind, name, "definition", str(i))] = definition
+    return out
+
+
+class _GroundingPickler(_IDPPickler):
+    """Pickles a grounding by reference to the objects of its program"""
+
+    def __init__(self, file, objects: dict[Tuple[str, ...], Any]):
+        super().__init__(file)
+        self.objects = {id(obj): (key, obj) for key, obj in objects.items()}
+
+    def persistent_id(self, obj):
+        found = self.objects.get(id(obj), None)
+        if found is not None and found[1] is obj:
+            return ("program",) + found[0]
+        return super().persistent_id(obj)
+
+
+class _GroundingUnpickler(_IDPUnpickler):
+    def __init__(self, file, idp: IDP):
+        super().__init__(file, idp.code)
+        self.objects = _program_objects(idp)
+
+    def persistent_load(self, pid):
+        if pid[0] == "program":
+            return self.objects[pid[1:]]
+        return super().persistent_load(pid)
+
+
+class _SharedPickler(pickle.Pickler):
+    """Pickles objects by reference to the `shared` objects"""
+
+    def __init__(self, file, shared: dict[int, Any]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj):
+        return id(obj) if id(obj) in self.shared and self.shared[id(obj)] is obj else None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    def __init__(self, data: bytes, shared: dict[int, Any]):
+        super().__init__(io.BytesIO(data))
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+    def load(self):
+        limit = sys.getrecursionlimit()
+        try:
+            sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+            return super().load()
+        finally:
+            sys.setrecursionlimit(limit)
+
 Done = True
@@ -23,8 +23,7 @@ routines to analyze Z3 expressions, e.g., the definition of a function in a mode
 
 from __future__ import annotations
 from datetime import date
-import re
-from typing import List, TYPE_CHECKING, Optional, Union
+from typing import List, TYPE_CHECKING, Optional, Tuple, Union
 from z3 import (ModelRef, FuncInterp, AstRef, ExprRef, DatatypeRef,
                 is_true, is_false, is_int_value, is_rational_value, is_algebraic_value,
                 is_and, is_or, is_eq, is_not, )
@@ -37,14 +36,47 @@ from .utils import RESERVED_SYMBOLS, DATE, INT, REAL
 if TYPE_CHECKING:
     from .Theory import Theory
 
-TRUEFALSE = re.compile(r"\b(True|False)\b")
+
+# the maximum number of conversions memoized for a type (see z3_to_idp)
+_MAX_VALUES = 100_000
 
 
 def z3_to_idp(val: ExprRef,
-              type_: SetName
+              type_: SetName,
+              memo: Optional[dict[str, dict[int, Tuple[ExprRef, Optional[Expression]]]]] = None
              ) -> Expression:
-    """convert a Z3 expression of type type_ to an IDP expression"""
+    """convert a Z3 expression of type type_ to an IDP expression
+
+    Args:
+        val (ExprRef): the Z3 expression
+        type_ (SetName): its type
+        memo (dict, optional): the conversions already made in the Z3 context of `val`,
+            by type name and id of the Z3 expression (see `Theory.z3_values`).
+            The Z3 expression is kept with its conversion, so that its id is not reused by Z3.
+            When given, the same IDP expression is returned for the same Z3 expression.
+    """
+    if val is None:
+        return None
+    if memo is None:
+        return _z3_to_idp(val, type_)
+    table = memo.get(type_.name, None)
+    if table is None:
+        table = memo[type_.name] = {}
+    key = val.get_id()
+    out = table.get(key, None)
+    if out is not None:
+        return out[1]
+    out = _z3_to_idp(val, type_, memo)
+    if _MAX_VALUES <= len(table):
+        table.clear()
+    table[key] = (val, out)  # also when the model does not determine the value
+    return out
 
+
+def _z3_to_idp(val: ExprRef,
+               type_: SetName,
+               memo: Optional[dict[str, dict[int, Tuple[ExprRef, Optional[Expression]]]]] = None
+              ) -> Expression:
     interp = getattr(type_.root_set.decl, "interpretation", None)
     enum_type = (interp.enumeration.type.name if interp and hasattr(interp.enumeration,  "type") else
                     type_.decl.name if type(type_.decl) == TypeDeclaration else
@@ -80,57 +112,102 @@ def z3_to_idp(val: ExprRef,
                     constructor = cons
             assert constructor is not None, f"wrong constructor name '{name}' for {type_}"
 
-            args = [z3_to_idp(a, s) for a, s in zip(val.children(), constructor.domains)]
+            args = [z3_to_idp(a, s, memo) for a, s in zip(val.children(), constructor.domains)]
             return AppliedSymbol.construct(constructor, args)
     return None
 
-def get_interpretations(theory: Theory, model: ModelRef, as_z3: bool
-                        ) -> dict[str, tuple[dict[str, Union[ExprRef, Expression]],
-                                             Optional[Union[ExprRef, Expression]]]]:
-    """analyze the Z3 function interpretations in the model
+def _atom_key(theory: Theory, atom: AppliedSymbol) -> Tuple[int, ...]:
+    """returns the ids of the Z3 arguments of a ground atom.
+
+    They are computed once per theory, and kept with the Z3 arguments,
+    so that their ids are not reused by Z3.
+    """
+    out = theory.atom_keys.get(atom.code, None)
+    if out is None:
+        args = [e.translate(theory) for e in atom.sub_exprs]
+        out = (tuple(a.get_id() for a in args), args)
+        theory.atom_keys[atom.code] = out
+    return out[0]
+
+
+class ModelValues(object):
+    """The values of the ground atoms in a Z3 model, extracted on demand.
 
     A Z3 interpretation maps some tuples of arguments to the value of the symbol applied to those tuples,
     and has a default (_else) value for the value of the symbol applied to other tuples.
+    The interpretation of a symbol is analyzed the first time
+    the value of one of its atoms is requested:
+    its tuples are keyed by the ids of their Z3 values,
+    and the values are converted to IDP expressions only when requested.
 
-    The function returns a mapping from symbol names
-    to 1) a mapping from some applied symbols to their value in the model
-    and 2) a default value (or None if undetermined in the model).
+    Attributes:
+        theory (Theory): the theory whose solver produced the model
+
+        model (ModelRef): the Z3 model
+
+        as_z3 (bool): whether the values are returned as Z3 expressions
+
+        interps (dict[str, tuple[SymbolDeclaration, dict[Tuple[int, ...], ExprRef], Optional[Union[ExprRef, Expression]]]]):
+            the analyzed interpretations, by symbol name
     """
-    out : dict[str, tuple[dict[str, Union[ExprRef, Expression]],
-                          Optional[Union[ExprRef, Expression]]]] = {}
-    for decl in theory.declarations.values():
-        if (isinstance(decl, SymbolDeclaration)
-        and decl.name is not None
-        and not decl.name in RESERVED_SYMBOLS):
-            map, _else = {}, None
-            if decl.name in theory.z3:  # otherwise, declared but not used in theory
-                interp = model[theory.z3[decl.name]]
-                if isinstance(interp, FuncInterp):
-                    try:
-                        a_list = interp.as_list()
-                    except:  # ast is null
-                        a_list = []
-                    if a_list:
-                        for args in a_list[:-1]:
-                            _args = (str(a) for a in args[:-1])
-                            applied = f"{decl.name}({', '.join(_args)})"
-                            # Replace True by true, False by false
-                            applied = re.sub(TRUEFALSE, lambda m: m.group(1).lower(), applied)
-                            val = args[-1]
-                            map[applied] = (val if as_z3 else
-                                            z3_to_idp(val, decl.codomain))
-
-                        # use the else value if we can translate it
-                        val = z3_to_idp(a_list[-1], decl.codomain)
-                        if val:
-                            _else = (a_list[-1] if as_z3 else val)
-                elif isinstance(interp, ExprRef):
-                    _else = (interp if as_z3 else
-                             z3_to_idp(interp, decl.codomain))
-                else:
-                    assert interp is None, "Internal error"
-            out[decl.name] = (map, _else)
-    return out
+
+    def __init__(self, theory: Theory, model: ModelRef, as_z3: bool):
+        self.theory = theory
+        self.model = model
+        self.as_z3 = as_z3
+        self.interps: dict[str, tuple[SymbolDeclaration, dict[Tuple[int, ...], ExprRef],
+                                      Optional[Union[ExprRef, Expression]]]] = {}
+
+    def get(self, atom: AppliedSymbol) -> Optional[Union[ExprRef, Expression]]:
+        """returns the value of the ground atom in the model,
+        or None if it is undetermined in the model"""
+        interp = self.interps.get(atom.symbol.name, None)
+        if interp is None:
+            decl = self.theory.declarations.get(atom.symbol.name, None)
+            interp = (self._interpretation(decl) if isinstance(decl, SymbolDeclaration)
+                      else (decl, {}, None))
+            self.interps[atom.symbol.name] = interp
+        decl, entries, _else = interp
+        if entries:
+            val = entries.get(_atom_key(self.theory, atom), None)
+            if val is not None:
+                return (val if self.as_z3 else
+                        z3_to_idp(val, decl.codomain, self.theory.z3_values))
+        return _else
+
+    def _interpretation(self, decl: SymbolDeclaration
+                        ) -> tuple[SymbolDeclaration, dict[Tuple[int, ...], ExprRef],
+                                   Optional[Union[ExprRef, Expression]]]:
+        """returns the declaration of the symbol, the tuples of its interpretation
+        in the model with their value, and its default value
+        (or None if undetermined in the model)
+        """
+        entries, _else = {}, None
+        if (decl.name is None
+        or decl.name in RESERVED_SYMBOLS
+        or decl.name not in self.theory.z3):  # declared but not used in theory
+            return decl, entries, _else
+        interp = self.model[self.theory.z3[decl.name]]
+        if isinstance(interp, FuncInterp):
+            try:
+                for i in range(interp.num_entries()):
+                    entry = interp.entry(i)
+                    key = tuple(entry.arg_value(j).get_id()
+                                for j in range(entry.num_args()))
+                    entries[key] = entry.value()
+                else_ = interp.else_value()
+            except:  # ast is null
+                return decl, {}, None
+            # use the else value if we can translate it
+            val = z3_to_idp(else_, decl.codomain, self.theory.z3_values)
+            if val:
+                _else = (else_ if self.as_z3 else val)
+        elif isinstance(interp, ExprRef):
+            _else = (interp if self.as_z3 else
+                     z3_to_idp(interp, decl.codomain, self.theory.z3_values))
+        else:
+            assert interp is None, "Internal error"
+        return decl, entries, _else
 
 def collect_questions(z3_expr: AstRef,
                       decl: SymbolDeclaration,
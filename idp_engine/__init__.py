@@ -1,4 +1,4 @@
-from .Parse      import IDP
+from .Parse      import IDP, BlockCache
 
 from .Annotate import Done
 from .Interpret import Done
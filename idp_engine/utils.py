@@ -36,6 +36,7 @@ if TYPE_CHECKING:
     Global Parameters:
 """
 
+VERSION = "0.10.12"  # keep in sync with pyproject.toml; part of the cache keys
 CO_CONSTR_RECURSION_DEPTH = 3
 MAX_QUANTIFIER_EXPANSION = 20
 RUN_FILE = tempfile.gettempdir() + "/IDP_Z3_run_log.txt"  # must be in /tmp folder for GAE
@@ -77,6 +78,11 @@ NOT_SATISFIABLE ="Not satisfiable."
 
 PROCESS_TIMINGS = {'ground': 0, 'parse': 0, 'solve': 0}
 
+# default grounding strategy, budget, number of processes, table size and
+# type constraints of a Theory (see `Theory` and `IDP.options`)
+GROUNDING = {'strategy': "full", 'budget': None, 'workers': 1, 'tables': None,
+             'type_constraints': "instance"}
+
 """ Module that monkey-patches json module when it's imported so
 JSONEncoder.default() automatically checks for a special "to_json()"
 method and uses it to encode the object if found.
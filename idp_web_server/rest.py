@@ -42,7 +42,7 @@ from flask import Flask, g, send_from_directory, request  # g is required for py
 from flask_cors import CORS
 from flask_restful import Resource, Api, reqparse
 
-from idp_engine import IDP
+from idp_engine import IDP, BlockCache
 from idp_engine.utils import log, RUN_FILE
 
 from idp_engine.Assignments import Status as S, str_to_IDP
@@ -93,6 +93,7 @@ class HelloWorld(Resource):
 
 z3lock = threading.Lock()
 idps: "dict[str, IDP]" = {}  # {code_string : idp}
+blocks = BlockCache()  # parsed blocks of the previous versions of the code
 
 
 def idpOf(code):
@@ -101,6 +102,12 @@ def idpOf(code):
     If the object doesn't exist yet, we create it.
     `idps` is a dict which contains an IDP object for each IDP code.
     This way, easy caching can be achieved.
+    When the code was edited, only its modified blocks are parsed again.
+    If the `IDP_Z3_CACHE_DIR` environment variable is set,
+    the parsed programs are also cached on disk, in that directory.
+    The cached programs are unpickled, which can execute arbitrary code:
+    the directory must only be writable by the user running the server
+    (see `IDP.from_str`).
 
     :arg code: the IDP code.
     :returns IDP: the IDP object.
@@ -109,7 +116,8 @@ def idpOf(code):
     if code in idps:
         return idps[code]
     else:
-        idp = IDP.from_str(code)
+        idp = IDP.from_str(code, cache_dir=os.environ.get('IDP_Z3_CACHE_DIR'),
+                           blocks=blocks)
         if 20 < len(idps):
             # remove oldest entry, to prevent memory overflow
             idps = {k: v for k, v in list(idps.items())[1:]}
@@ -17,6 +17,8 @@ pipeline.
 
 The api test will call the idp-engine API.
 
+The benchmark, import, memory and translation tests measure the performance of the engine.
+
 By default, the generate and api tests are run.
 
 Authors: Pierre Carbonelle, Simon Vandevelde
@@ -34,6 +36,7 @@ import os
 import pprint
 import pretty_errors
 import sys
+import tempfile
 import threading
 import time
 import traceback
@@ -45,7 +48,8 @@ import re
 from idp_web_server.State import State
 from idp_web_server.IO import Output, metaJSON
 from idp_engine import IDP, Theory, model_expand, Status as S
-from idp_engine.utils import (start, log, NEWL)
+from idp_engine.Expression import AppliedSymbol
+from idp_engine.utils import (start, log, NEWL, IDPZ3Error)
 
 z3lock = threading.Lock()
 
@@ -219,6 +223,139 @@ def api():
         problem = Theory(T)
         problem.assert_("p()", True, S.GIVEN)
         out.append(str((problem.propagate().assignments)))
+
+        # the copies of a theory are independent
+        problem = Theory(T, S1)
+        copied = problem.copy()
+        copied.assert_("p()", True, S.GIVEN)
+        out.append(str(copied.simplify().formula()))
+        out.append(str(copied.symbolic_propagate().assignments))
+        out.append(str(problem.simplify().formula()))
+
+        # the Z3 translations are shared by the theories of a program
+        out.append(f"shared translations: {Theory(T, S1).ctx is problem.ctx}")
+        out.append("shared with other options: "
+                   f"{Theory(T, S1, type_constraints='sort').ctx is problem.ctx}")
+        shared = []
+        thread = threading.Thread(target=lambda: shared.append(Theory(T, S1).ctx is problem.ctx))
+        thread.start()
+        thread.join()
+        out.append(f"shared with another thread: {shared[0]}")
+
+        # the ground atoms are shared by the occurrences with the same original,
+        # and copied before being changed
+        kb = IDP.from_str("""
+            vocabulary {
+                type N := {1..3}
+                p: N -> Bool
+                q: N -> Bool
+            }
+            theory {
+                !x, y in N: p(x) | q(y).
+                !x in N: p(x) | ~q(x).
+            }
+            structure {}
+        """)
+        def atoms(e, code, found):
+            if type(e) == AppliedSymbol and e.code == code:
+                found.append(e)
+            for sub in e.sub_exprs:
+                atoms(sub, code, found)
+            return found
+        problem = Theory(*kb.get_blocks("T, S"))
+        first, second = [atoms(c, "p(1)", []) for c in problem.constraints]
+        out.append(f"shared in the first constraint: {all(a is first[0] for a in first)}")
+        out.append(f"shared with the second one: {second[0] is first[0]}")
+        out.append(f"same structural key: {second[0].key == first[0].key}, "
+                   f"{atoms(list(problem.constraints)[0], 'q(1)', [])[0].key == first[0].key}")
+        changed = first[0]._change(sub_exprs=second[0].sub_exprs[:])
+        out.append(f"copied before change: {changed is not first[0]}, "
+                   f"{[str(a) for a in first]}")
+
+        # the parallel grounding gives the same theory, with its ground atoms
+        parallel = Theory(*kb.get_blocks("T, S"), workers=2)
+        out.append("same parallel grounding: "
+                   f"{str(parallel.formula()) == str(Theory(*kb.get_blocks('T, S')).formula())}, "
+                   f"{sorted(atom.code for atom in parallel.ground_terms.values())}")
+
+        # budget on the estimated size of the grounding
+        try:
+            Theory(T, S1, budget=1)
+            out.append("no error")
+        except IDPZ3Error as exc:
+            out.append(str(exc))
+
+        # default options of the theories of a program
+        sizes = []
+        T.voc.idp.options = {'budget': 1, 'sizes': sizes}
+        try:
+            Theory(T, S1)
+            out.append("no error")
+        except IDPZ3Error as exc:
+            out.append(f"budget of the program: {sizes}")
+        out.append(f"explicit budget: {Theory(T, S1, budget=2).budget}, {sizes}")
+        T.voc.idp.options = {}
+
+        # on-disk cache of parsed programs
+        with tempfile.TemporaryDirectory() as cache_dir:
+            IDP.from_str(test, cache_dir=cache_dir)
+            files = glob.glob(os.path.join(cache_dir, "*.idp.pickle"))
+            out.append(f"cached: {len(files)}")
+            kb = IDP.from_str(test, cache_dir=cache_dir)
+            T, S1 = kb.get_blocks("T, S")
+            out.extend(str(model) for model in model_expand(T, S1, sort=True))
+            kb = IDP.from_str(test, cache_dir=cache_dir)  # with the grounding
+            T, S1 = kb.get_blocks("T, S")
+            groundings = glob.glob(os.path.join(cache_dir, "*.grounding.pickle"))
+            out.append(f"cached groundings: {len(groundings)}")
+            out.extend(str(model) for model in model_expand(T, S1, sort=True))
+            with open(files[0], "wb") as fp:  # corrupted entry
+                fp.write(b"not a pickle")
+            kb = IDP.from_str(test, cache_dir=cache_dir)
+            T, S1 = kb.get_blocks("T, S")
+            out.extend(str(model) for model in model_expand(T, S1, sort=True))
+            if hasattr(os, 'getuid'):  # the entries writable by others are parsed again
+                os.chmod(files[0], 0o666)
+                IDP.from_str(test, cache_dir=cache_dir)
+                out.append("writable entry replaced: "
+                           f"{not os.stat(files[0]).st_mode & 0o022}")
+            else:
+                out.append("writable entry replaced: True")
+
+            # the cached grounding of an inductive definition gives the same results
+            closure = """
+                vocabulary {
+                    type N := {1..4}
+                    e: N * N -> Bool
+                    r: N * N -> Bool
+                }
+                theory {
+                    { !x, y in N: r(x, y) <- e(x, y).
+                      !x, y in N: r(x, y) <- ?z in N: e(x, z) & r(z, y). }
+                    r(1, 3). ~e(1, 3).
+                }
+                structure {}
+            """
+            results = []
+            for _ in range(2):  # cold, then warm
+                kb = IDP.from_str(closure, cache_dir=cache_dir)
+                T, S1 = kb.get_blocks("T, S")
+                results.append([str(Theory(T, S1).formula())]
+                               + [str(m) for m in model_expand(T, S1, max=2, sort=True)])
+            out.append(f"same results with a cached definition: {results[0] == results[1]}")
+            out.extend(results[1][1:])
+
+        # file enumerations are relative to the folder of the program
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "q.csv"), "w") as fp:
+                fp.write("a\nc\n")
+            with open(os.path.join(folder, "q.idp"), "w") as fp:
+                fp.write("""
+                    vocabulary { type T := {a, b, c}  q: T -> Bool }
+                    theory { }
+                    structure { q := file("q.csv"). }""")
+            kb = IDP.from_file(os.path.join(folder, "q.idp"))
+            out.append(str(kb.structures['S'].interpretations['q']))
     except Exception as exc:
         out.append(str(traceback.format_exc()))
         error = 1
@@ -286,6 +423,58 @@ def benchmark():
     except ModuleNotFoundError:
         print(timings)
 
+def import_benchmark():
+    """
+    Measure the time to import the engine, and to parse a first program.
+    """
+    import subprocess
+    steps = {'import': ['-c', "import idp_engine"],
+             'first parse': ['-c', "import idp_engine; "
+                             "idp_engine.IDP.from_str('vocabulary {} theory {}')"],
+             'version': ['idp-engine.py', '--version']}
+    timings = {}
+    for name, args in steps.items():
+        elapsed = []
+        for i in range(0, 5):
+            start = time.time()
+            subprocess.run([sys.executable] + args, capture_output=True)
+            elapsed.append(time.time()-start)
+        timings[name] = round(min(elapsed), 3)
+    print(timings)
+
+def memory_benchmark():
+    """
+    Measure the memory used by the grounding of known problems, in MB.
+    """
+    import tracemalloc
+    benchmarks = ['edges_prop_100', 'pigeon_mx_200', 'adhesive_150', 'sudoku_mx_9']
+    sizes = {}
+    for t_name in benchmarks:
+        kb = IDP.from_file(f'tests/Benchmark/{t_name}.idp')
+        tracemalloc.start()
+        problem = Theory(*kb.theories.values(), *kb.structures.values())
+        sizes[t_name] = round(tracemalloc.get_traced_memory()[0] / 2**20, 1)
+        tracemalloc.stop()
+        del problem
+    print(sizes)
+
+
+def translation_benchmark():
+    """
+    Measure the time taken by the translation of known problems to Z3, in seconds.
+    """
+    benchmarks = ['edges_prop_100', 'pigeon_mx_200', 'nqueens_mx_24', 'sudoku_mx_9']
+    times = {}
+    for t_name in benchmarks:
+        kb = IDP.from_file(f'tests/Benchmark/{t_name}.idp')
+        problem = Theory(*kb.theories.values(), *kb.structures.values())
+        begin = time.process_time()
+        problem.constraintz()
+        times[t_name] = round(time.process_time() - begin, 2)
+    print(times)
+
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run the tests')
     parser.add_argument('TEST', nargs='*', default=["generate", "api"])
@@ -304,6 +493,12 @@ if __name__ == "__main__":
 
     if "benchmark" in args.TEST:
         benchmark()
+    if "import" in args.TEST:
+        import_benchmark()
+    if "memory" in args.TEST:
+        memory_benchmark()
+    if "translation" in args.TEST:
+        translation_benchmark()
 
     print(f'G: {g_error}, P: {p_error}, A: {a_error}')
     sys.exit(error)